@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+模板匹配性能测试工具
+在 debug_screenshots/*.jpg 上对比原分辨率全图匹配与金字塔粗到细匹配的耗时和召回率
+"""
+
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+import config
+from frame import Frame
+from template_matcher import PyramidMatcher
+from template_registry import TemplateRegistry
+from bot_logging import setup_logging
+
+
+def plant_templates(screen, entries, rng, copies=2):
+    """把模板贴到截图的随机位置，制造已知的正样本"""
+    screen = screen.copy()
+    h, w = screen.shape[:2]
+    for entry in entries:
+        for _ in range(copies):
+            x = int(rng.integers(0, w - entry.width))
+            y = int(rng.integers(0, h - entry.height))
+            screen[y:y + entry.height, x:x + entry.width] = entry.color
+    return screen
+
+
+def to_centers(matches, entry, min_distance):
+    """匹配结果转为去重后的中心点"""
+    centers = []
+    for x, y, conf in sorted(matches, key=lambda m: m[2], reverse=True):
+        cx, cy = x + entry.width // 2, y + entry.height // 2
+        if all((cx - ux) ** 2 + (cy - uy) ** 2 >= min_distance ** 2 for ux, uy in centers):
+            centers.append((cx, cy))
+    return centers
+
+
+def recall(reference, candidates, min_distance):
+    """reference 中被 candidates 找回的比例"""
+    if not reference:
+        return None
+    found = 0
+    for rx, ry in reference:
+        if any((rx - cx) ** 2 + (ry - cy) ** 2 < min_distance ** 2 for cx, cy in candidates):
+            found += 1
+    return found / len(reference)
+
+
+def benchmark(args):
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    shots = sorted(glob.glob(os.path.join(base_path, "debug_screenshots", "*.jpg")))
+    if not shots:
+        print("❌ debug_screenshots 中没有截图")
+        return
+
+    setup_logging()
+    registry = TemplateRegistry(os.path.join(base_path, "templates"), config.TEMPLATES,
+                                scales=config.TEMPLATE_OPTIONS["scales"])
+    entries = [registry.get(name) for names in config.TEMPLATES.values() for name in names]
+    entries = [e for e in entries if e is not None]
+
+    baseline = PyramidMatcher(level=0)
+    pyramid = PyramidMatcher(level=args.level,
+                             coarse_slack=config.MATCHING["coarse_slack"],
+                             refine_margin=config.MATCHING["refine_margin"],
+                             max_candidates=config.MATCHING["max_candidates"])
+    min_distance = config.THRESHOLDS["duplicate_distance"]
+    rng = np.random.default_rng(0)
+
+    print("🏁 模板匹配性能测试")
+    print(f"   截图: {len(shots)} 张, 模板: {len(entries)} 个, 金字塔层级: {args.level}, 阈值: {args.threshold}")
+    print("=" * 60)
+
+    total_base, total_pyr = 0.0, 0.0
+    recalls = []
+    for path in shots:
+        screen = cv2.imread(path)
+        if args.resize:
+            screen = cv2.resize(screen, (config.GAME_WINDOW["width"], config.GAME_WINDOW["height"]))
+        if args.plant:
+            screen = plant_templates(screen, entries, rng)
+
+        base_time, pyr_time = 0.0, 0.0
+        for entry in entries:
+            # 每种方法使用独立的帧对象，金字塔构建时间计入金字塔方法
+            frame = Frame(screen)
+            start = time.perf_counter()
+            base_matches = baseline.match(frame, entry, args.threshold)
+            base_time += time.perf_counter() - start
+
+            frame = Frame(screen)
+            start = time.perf_counter()
+            pyr_matches = pyramid.match(frame, entry, args.threshold)
+            pyr_time += time.perf_counter() - start
+
+            r = recall(to_centers(base_matches, entry, min_distance),
+                       to_centers(pyr_matches, entry, min_distance), min_distance)
+            if r is not None:
+                recalls.append(r)
+
+        total_base += base_time
+        total_pyr += pyr_time
+        print(f"{os.path.basename(path)}: 原方法 {base_time * 1000:.0f}ms, "
+              f"金字塔 {pyr_time * 1000:.0f}ms, 加速 {base_time / max(pyr_time, 1e-9):.1f}x")
+
+    print("-" * 60)
+    print(f"总耗时: 原方法 {total_base:.2f}s, 金字塔 {total_pyr:.2f}s, "
+          f"加速 {total_base / max(total_pyr, 1e-9):.1f}x")
+    if recalls:
+        print(f"召回率: {np.mean(recalls) * 100:.1f}% ({len(recalls)} 组有命中的模板/截图)")
+    else:
+        print("召回率: 原方法没有命中（可使用 --plant 贴入模板制造正样本）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="模板匹配性能测试")
+    parser.add_argument("--level", type=int, default=config.MATCHING["pyramid_level"],
+                        help="金字塔层级")
+    parser.add_argument("--threshold", type=float, default=config.THRESHOLDS["door_template"],
+                        help="匹配阈值")
+    parser.add_argument("--plant", action="store_true",
+                        help="把模板贴到截图随机位置，测试召回率")
+    parser.add_argument("--resize", action="store_true",
+                        help="先把截图缩放到 GAME_WINDOW 尺寸")
+    benchmark(parser.parse_args())
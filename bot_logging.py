@@ -0,0 +1,131 @@
+"""
+DNF Bot 日志
+分级日志代替热路径上的 print：检测命中等每帧都会出现的消息用 DEBUG，动作和定期汇总用 INFO，
+状态切换单独使用 dnf.state 日志器，出错用 ERROR；
+主循环线程只把日志记录放进有界队列，由后台线程写控制台 / 文件（Windows 控制台输出很慢，不再阻塞主循环），
+同一条消息在限流间隔内重复出现时只输出第一次，下一次输出时附上省略的次数
+
+详细程度：
+    quiet  - 只输出状态切换、警告和错误（正式运行）
+    normal - 另外输出动作和定期汇总
+    debug  - 另外输出每帧的检测命中
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+
+ROOT = "dnf"
+STATE = "dnf.state"
+
+VERBOSITY = {
+    "quiet": logging.WARNING,
+    "normal": logging.INFO,
+    "debug": logging.DEBUG
+}
+
+
+def get_logger(name):
+    """模块日志器，如 get_logger("detect") -> dnf.detect"""
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+class RateLimitFilter(logging.Filter):
+    """同一位置的同一条消息（按未格式化的消息模板区分）在 interval 秒内只放行一次
+
+    exempt 中的日志器（默认是状态切换）不限流
+    """
+
+    def __init__(self, interval=5.0, exempt=(STATE,)):
+        super().__init__()
+        self.interval = interval
+        self.exempt = set(exempt)
+        # {(日志器名, 级别, 消息模板): [上次放行时间, 之后被省略的次数]}
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.interval <= 0 or record.name in self.exempt:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = record.created
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                return False
+            suppressed = entry[1] if entry is not None else 0
+            self._seen[key] = [now, 0]
+        if suppressed:
+            record.msg = f"{record.msg}（{self.interval:.0f}s 内重复 {suppressed} 次已省略）"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃新记录并计数，不阻塞调用线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LoggingState:
+    def __init__(self):
+        self.listener = None
+        self.handler = None
+
+
+_state = _LoggingState()
+
+
+def setup_logging(verbosity="normal", rate_limit=5.0, queue_size=1000, log_file=None):
+    """配置 dnf.* 日志器：有界队列 + 后台输出线程，可重复调用（以最后一次为准）"""
+    if verbosity not in VERBOSITY:
+        raise ValueError(f"未知的日志详细程度: {verbosity}（可选 {', '.join(VERBOSITY)}）")
+    shutdown_logging()
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    outputs = [console]
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        outputs.append(file_handler)
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RateLimitFilter(rate_limit))
+    listener = logging.handlers.QueueListener(handler.queue, *outputs, respect_handler_level=True)
+
+    root = logging.getLogger(ROOT)
+    root.handlers = [handler]
+    root.setLevel(VERBOSITY[verbosity])
+    root.propagate = False
+    # 状态切换在任何详细程度下都输出
+    logging.getLogger(STATE).setLevel(logging.INFO)
+
+    listener.start()
+    _state.listener = listener
+    _state.handler = handler
+
+
+def dropped_count():
+    """因队列满被丢弃的日志条数"""
+    return _state.handler.dropped if _state.handler is not None else 0
+
+
+def shutdown_logging():
+    """停止后台输出线程，输出队列中剩余的日志"""
+    if _state.listener is not None:
+        _state.listener.stop()
+        _state.listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,282 @@
+"""
+DNF Bot 动作时间校准
+校准模式实测角色的移动速度、攻击/拾取动作时长和过图时间（由帧差判断画面何时稳定），
+按角色档案保存为 JSON；运行时使用档案中的实测值并在线修正，代替 config.DELAYS 中的固定等待。
+档案分别保存校准值（基准）和运行中修正后的值，修正范围始终相对基准限制，多次运行不会累积漂移
+"""
+
+import json
+import os
+import time
+import pyautogui
+from change_detector import ChangeDetector
+
+
+class TimingProfile:
+    """按角色保存的实测参数"""
+
+    def __init__(self, path, defaults, adapt_rate=0.2):
+        self.path = path
+        # 基准值：校准得到的实测值，没有校准时为默认值（来自 config）
+        self.baseline = dict(defaults)
+        # 当前使用的值：基准值经运行中在线修正后的结果
+        self.values = dict(defaults)
+        # 在线修正的更新系数
+        self.adapt_rate = adapt_rate
+        self.calibrated = False
+
+    def load(self):
+        """读取档案文件，不存在时保持默认值"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  角色档案读取失败，使用默认值: {e}")
+            return False
+        for name, value in data.get("values", {}).items():
+            if name in self.values:
+                self.baseline[name] = self.values[name] = float(value)
+        for name, value in data.get("adapted", {}).items():
+            if name in self.values:
+                self.values[name] = self.clamp(name, float(value))
+        self.calibrated = bool(data.get("calibrated", False))
+        return True
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"calibrated": self.calibrated, "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "values": self.baseline, "adapted": self.values}, f, ensure_ascii=False, indent=2)
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def set(self, name, value):
+        """设置校准值（同时作为基准值和当前值）"""
+        self.baseline[name] = self.values[name] = float(value)
+
+    def set_adapted(self, name, value):
+        """保存运行中修正后的值（基准值不变）"""
+        self.values[name] = self.clamp(name, float(value))
+
+    def clamp(self, name, value):
+        """修正后的值限制在基准值的 0.25 ~ 4 倍"""
+        baseline = self.baseline[name]
+        return min(baseline * 4, max(baseline * 0.25, value))
+
+    def adapt(self, name, observed):
+        """用运行中观测到的值修正参数（指数平滑）"""
+        self.values[name] = self.clamp(name, self.values[name] + self.adapt_rate * (observed - self.values[name]))
+        return self.values[name]
+
+    def summary(self):
+        return ", ".join(f"{name}={value:.2f}" for name, value in self.values.items())
+
+
+class ActionTimer:
+    """运行中测量攻击/拾取动作的实际时长：按键后角色周围的图块先出现变化（游戏已响应），
+    之后连续几帧没有变化即视为动作结束
+
+    按键之前截取的帧不参与判断；只使用完整结束的样本；测量期间有其他动作或移动、周围一直有变化（如怪物经过）超时时放弃本次测量
+    """
+
+    def __init__(self, radius=150, quiet_tiles=1, settle_frames=2, timeout=3.0):
+        # 以角色为中心观察的范围（像素）
+        self.radius = radius
+        self.quiet_tiles = quiet_tiles
+        self.settle_frames = settle_frames
+        self.timeout = timeout
+
+        # 正在测量的动作: (名称, 观察区域, 按键时间)
+        self.current = None
+        # 按键后角色周围是否已经出现过变化
+        self.reacted = False
+        self.quiet = 0
+        self.quiet_since = None
+
+        # 统计：完成 / 放弃的测量次数
+        self.completed = 0
+        self.abandoned = 0
+
+    def begin(self, name, char_pos, t):
+        """按下动作键时调用"""
+        self.cancel()
+        x, y = char_pos
+        r = self.radius
+        self.current = (name, (x - r, y - r, x + r, y + r), t)
+        self.reacted = False
+        self.quiet = 0
+        self.quiet_since = None
+
+    def cancel(self):
+        """其他按键打断了测量"""
+        if self.current is not None:
+            self.abandoned += 1
+            self.current = None
+
+    def observe(self, dirty, t):
+        """处理一帧的脏图块图，动作结束时返回 (名称, 时长秒)，否则返回 None"""
+        if self.current is None or dirty is None:
+            return None
+        name, region, start = self.current
+        if t <= start:
+            # 按键之前截取的帧（后台截图线程的最新帧可能早于按键）
+            return None
+        if t - start > self.timeout:
+            self.cancel()
+            return None
+        changed = dirty.count_in(region)
+        if changed is None:
+            # 整帧刷新的帧没有变化信息
+            return None
+        if changed > self.quiet_tiles:
+            self.reacted = True
+            self.quiet = 0
+            return None
+        if not self.reacted:
+            # 游戏还没有响应按键，不能算作动作结束
+            return None
+        if self.quiet == 0:
+            self.quiet_since = t
+        self.quiet += 1
+        if self.quiet < self.settle_frames:
+            return None
+        self.current = None
+        self.completed += 1
+        return name, max(0.0, self.quiet_since - start)
+
+    def report(self, profile):
+        return (f"⏲️ 动作时长: attack {profile['attack']:.2f}s, pickup {profile['pickup']:.2f}s "
+                f"(测量 {self.completed} 次, 放弃 {self.abandoned} 次)")
+
+
+class Calibrator:
+    """校准模式：在空房间内依次测量移动速度、动作时长和过图时间"""
+
+    def __init__(self, bot, profile, hold=0.5, repeats=3, settle_frames=3, quiet_tiles=1,
+                 transition_fraction=0.3, timeout=5.0):
+        self.bot = bot
+        self.profile = profile
+        # 每次测速按住方向键的时间和重复次数
+        self.hold = hold
+        self.repeats = repeats
+        # 连续多少帧几乎没有变化视为画面稳定
+        self.settle_frames = settle_frames
+        # 变化图块数不超过该值视为画面没有变化
+        self.quiet_tiles = quiet_tiles
+        # 变化图块比例超过该值视为发生了过图（黑屏/淡出）
+        self.transition_fraction = transition_fraction
+        self.timeout = timeout
+
+    def locate(self):
+        """整帧检测角色位置，检测不到返回 None"""
+        pos, _ = self.bot.locator.locate(self.bot.capture_frame())
+        return pos
+
+    def measure_speed(self, key, axis, sign):
+        """按住 key 若干次，返回该方向的平均移动速度（像素/秒），失败返回 None"""
+        samples = []
+        for _ in range(self.repeats):
+            start = self.locate()
+            # 实际按住时间从按下到松开的调用开始计算（pyautogui 在每次按键调用后可能还会暂停 PAUSE 秒）
+            pressed_at = time.perf_counter()
+            pyautogui.keyDown(key)
+            time.sleep(self.hold)
+            released_at = time.perf_counter()
+            pyautogui.keyUp(key)
+            held = released_at - pressed_at
+            time.sleep(0.2)
+            end = self.locate()
+            if start is None or end is None:
+                continue
+            moved = (end[axis] - start[axis]) * sign
+            if moved > 0:
+                samples.append(moved / held)
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+
+    def measure_settle(self, key, require_change=False):
+        """按下 key 后直到画面稳定所用的时间（秒），超时返回 None
+
+        画面必须先出现变化（游戏已响应按键）才开始判断稳定，按键之前截取的帧不参与判断
+        require_change: 变化必须是明显的整屏变化（过图时的黑屏/淡出），并且画面亮度恢复后才开始判断稳定
+        """
+        changes = ChangeDetector(full_refresh_interval=10 ** 9)
+        first = self.bot.capture_frame()
+        changes.update(first)
+        brightness = float(first.gray_pyramid(changes.level).mean())
+
+        start = time.time()
+        pyautogui.press(key)
+        changed = False
+        quiet = 0
+        quiet_since = None
+        while time.time() - start < self.timeout:
+            frame = self.bot.capture_frame()
+            if frame is None:
+                continue
+            dirty = changes.update(frame)
+            if frame.timestamp <= start:
+                continue
+            tiles = int(dirty.tiles.sum())
+            if dirty.fraction >= self.transition_fraction or (not require_change and tiles > self.quiet_tiles):
+                changed = True
+            if require_change and frame.gray_pyramid(changes.level).mean() < brightness * 0.5:
+                # 黑屏期间画面也不变，不能算作稳定
+                quiet = 0
+                continue
+            if changed and tiles <= self.quiet_tiles:
+                if quiet == 0:
+                    quiet_since = frame.timestamp
+                quiet += 1
+                if quiet >= self.settle_frames:
+                    return max(0.0, quiet_since - start)
+            else:
+                quiet = 0
+        return None
+
+    def run(self, include_door=True):
+        """执行完整校准并保存档案"""
+        keys = self.bot.config.KEYS
+        print("🔧 校准模式：请让角色站在空房间中间，3秒后开始...")
+        time.sleep(3)
+
+        speeds = {
+            "speed_x": [self.measure_speed(keys["right"], 0, 1), self.measure_speed(keys["left"], 0, -1)],
+            "speed_y": [self.measure_speed(keys["down"], 1, 1), self.measure_speed(keys["up"], 1, -1)]
+        }
+        for name, values in speeds.items():
+            values = [v for v in values if v]
+            if values:
+                self.profile.set(name, sum(values) / len(values))
+                print(f"   {name}: {self.profile[name]:.0f} px/s")
+            else:
+                print(f"   ⚠️  {name}: 检测不到角色位移，保留 {self.profile[name]:.0f} px/s")
+
+        for name in ("attack", "pickup"):
+            settle = self.measure_settle(keys[name])
+            if settle is not None:
+                self.profile.set(name, settle)
+                print(f"   {name}: {settle:.2f}s")
+            else:
+                print(f"   ⚠️  {name}: 画面没有稳定，保留 {self.profile[name]:.2f}s")
+
+        if include_door:
+            print("🚪 请在5秒内把角色移动到传送门前...")
+            time.sleep(5)
+            settle = self.measure_settle(keys["enter_door"], require_change=True)
+            if settle is not None:
+                self.profile.set("door_enter", settle)
+                print(f"   door_enter: {settle:.2f}s")
+            else:
+                print(f"   ⚠️  door_enter: 没有检测到过图，保留 {self.profile['door_enter']:.2f}s")
+
+        self.profile.calibrated = True
+        self.profile.save()
+        print(f"✅ 校准完成，已保存到 {self.profile.path}")
+        print(f"   {self.profile.summary()}")
@@ -0,0 +1,137 @@
+"""
+DNF Bot 后台截图线程
+按目标帧率持续截图到预分配的环形缓冲区，检测端总是取最新一帧，
+动作中的 sleep 不再阻塞画面采集
+"""
+
+import threading
+import time
+import numpy as np
+from frame import Frame
+from screen_capture import ScreenCapture
+from bot_logging import get_logger
+
+log = get_logger("capture")
+
+
+class CaptureThread(threading.Thread):
+    """后台截图线程 + 最新帧环形缓冲区"""
+
+    def __init__(self, region, fps=30, buffer_count=3):
+        super().__init__(name="CaptureThread", daemon=True)
+        self.region = region
+        self.interval = 1.0 / fps if fps > 0 else 0
+        # 至少3个槽位：正在写入 / 最新一帧 / 检测端正在使用
+        self.buffer_count = max(3, buffer_count)
+
+        self.capture = None
+        self._slots = []
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+
+        # 最新一帧: (槽位, 时间戳, 序号)
+        self._latest = None
+        self._latest_consumed = True
+        # 检测端当前持有的槽位，写入时跳过
+        self._held_index = None
+        self._seq = 0
+
+        # 统计计数
+        self.captured_frames = 0
+        self.dropped_frames = 0      # 未被检测端取走就被新帧覆盖
+        self.missed_deadlines = 0    # 截图耗时超过目标帧间隔
+        self.error = None
+
+    def run(self):
+        try:
+            # mss 对象不能跨线程使用，必须在截图线程内创建
+            self.capture = ScreenCapture(self.region, buffer_count=1)
+            first = self.capture.grab()
+            self._slots = [np.empty_like(first) for _ in range(self.buffer_count)]
+
+            next_tick = time.perf_counter()
+            while not self._stop_event.is_set():
+                index = self._pick_slot()
+                self.capture.grab(out=self._slots[index])
+                timestamp = time.time()
+
+                with self._lock:
+                    if not self._latest_consumed:
+                        self.dropped_frames += 1
+                    self._seq += 1
+                    self._latest = (index, timestamp, self._seq)
+                    self._latest_consumed = False
+                    self.captured_frames += 1
+                    self._new_frame.notify_all()
+
+                # 按目标帧率节拍，跟不上时记录并重新对齐
+                next_tick += self.interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    if self.interval > 0:
+                        self.missed_deadlines += 1
+                    next_tick = time.perf_counter()
+        except Exception as e:
+            self.error = e
+            log.error("❌ 截图线程错误: %s", e)
+            with self._lock:
+                self._new_frame.notify_all()
+
+    def _pick_slot(self):
+        """选择一个既不是最新帧、也没被检测端持有的槽位"""
+        with self._lock:
+            busy = {self._held_index}
+            if self._latest is not None:
+                busy.add(self._latest[0])
+        for index in range(self.buffer_count):
+            if index not in busy:
+                return index
+        return 0
+
+    def latest(self, newer_than=0, timeout=1.0):
+        """获取最新一帧（Frame，带时间戳和序号）
+
+        newer_than: 只返回序号大于该值的帧，没有新帧时最多等待 timeout 秒
+        返回的帧在下一次调用 latest 之前不会被覆盖；超时返回 None
+        """
+        with self._lock:
+            ready = self._new_frame.wait_for(
+                lambda: (self._latest is not None and self._latest[2] > newer_than)
+                or self.error is not None or self._stop_event.is_set(),
+                timeout)
+            if not ready or self._latest is None or self._latest[2] <= newer_than:
+                return None
+
+            index, timestamp, seq = self._latest
+            self._held_index = index
+            self._latest_consumed = True
+            return Frame(self._slots[index], timestamp=timestamp, seq=seq)
+
+    def stop(self, timeout=1.0):
+        """停止截图线程"""
+        self._stop_event.set()
+        with self._lock:
+            self._new_frame.notify_all()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        """截图线程统计"""
+        stats = {
+            "captured": self.captured_frames,
+            "dropped": self.dropped_frames,
+            "missed_deadlines": self.missed_deadlines
+        }
+        if self.capture is not None:
+            stats.update(self.capture.stats())
+        return stats
+
+    def report(self):
+        """格式化的截图线程报告"""
+        s = self.stats()
+        return (f"📷 截图线程: 已截取 {s['captured']} 帧, 丢弃 {s['dropped']} 帧, "
+                f"超时 {s['missed_deadlines']} 次, 平均耗时 {s.get('avg_ms', 0.0):.1f}ms")
@@ -0,0 +1,197 @@
+"""
+DNF Bot 帧差变化检测
+在降采样的灰度图上与上一帧做差分，得到按图块划分的变化图（脏图块），
+检测器只在脏图块上重新运行，干净图块沿用上次的结果，每隔若干帧强制整帧刷新一次
+"""
+
+import cv2
+import numpy as np
+from frame import Frame
+from search_regions import merge_rects
+from instrumentation import metrics
+
+
+class DirtyMap:
+    """一帧的脏图块图"""
+
+    def __init__(self, tiles, tile_size, width, height, full=False):
+        # tiles[row, col] 为 True 表示该图块有变化
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.width = width
+        self.height = height
+        # 整帧刷新（首帧、分辨率变化或到了强制刷新间隔）
+        self.full = full
+
+    def any(self):
+        return self.full or bool(self.tiles.any())
+
+    @property
+    def fraction(self):
+        """脏图块所占比例"""
+        if self.full:
+            return 1.0
+        return float(self.tiles.mean()) if self.tiles.size else 0.0
+
+    def union(self, other):
+        """与另一帧的脏图块图合并（检测器跳过若干帧后，需要重新检测这期间变化过的图块）"""
+        if other is None:
+            return self
+        if self.full or other.full or self.tiles.shape != other.tiles.shape:
+            return DirtyMap(self.tiles, self.tile_size, self.width, self.height, full=True)
+        return DirtyMap(self.tiles | other.tiles, self.tile_size, self.width, self.height)
+
+    def count_in(self, rect):
+        """与矩形 (x0, y0, x1, y1) 相交的脏图块数；整帧刷新时返回 None"""
+        if self.full:
+            return None
+        t = self.tile_size
+        x0, y0, x1, y1 = rect
+        c0, r0 = max(0, int(x0) // t), max(0, int(y0) // t)
+        c1, r1 = max(0, -(-int(x1) // t)), max(0, -(-int(y1) // t))
+        return int(self.tiles[r0:r1, c0:c1].sum())
+
+    def rects(self):
+        """脏图块合并成的矩形列表 [(x0, y0, x1, y1)]（整帧像素坐标）"""
+        t = self.tile_size
+        rects = []
+        for row in range(self.tiles.shape[0]):
+            # 每行连续的脏图块合成一段
+            cols = np.flatnonzero(self.tiles[row])
+            if len(cols) == 0:
+                continue
+            splits = np.flatnonzero(np.diff(cols) > 1) + 1
+            for run in np.split(cols, splits):
+                rects.append((int(run[0]) * t, row * t,
+                              min(self.width, (int(run[-1]) + 1) * t), min(self.height, (row + 1) * t)))
+        return merge_rects(rects)
+
+
+class ChangeDetector:
+    """逐帧比较降采样灰度图，输出脏图块图"""
+
+    def __init__(self, tile_size=64, level=2, pixel_threshold=12, min_pixels=2,
+                 full_refresh_interval=15):
+        # 图块大小（原分辨率像素），应为 2^level 的整数倍
+        self.tile_size = tile_size
+        # 差分使用的金字塔层
+        self.level = level
+        # 灰度差超过该值的像素视为变化
+        self.pixel_threshold = pixel_threshold
+        # 图块内（降采样后）变化像素数达到该值才算脏图块，过滤噪点
+        self.min_pixels = min_pixels
+        self.full_refresh_interval = full_refresh_interval
+
+        self.previous = None
+        self.frames_since_full = 0
+
+        # 统计：处理帧数、整帧刷新次数、脏图块比例累计
+        self.frames = 0
+        self.full_refreshes = 0
+        self.dirty_total = 0.0
+
+    @metrics.timed("cv2.frame_diff")
+    def update(self, frame):
+        """与上一帧比较，返回本帧的 DirtyMap"""
+        frame = Frame.wrap(frame)
+        small = frame.gray_pyramid(self.level)
+        factor = 2 ** self.level
+        cell = max(1, self.tile_size // factor)
+        h, w = small.shape
+        rows, cols = -(-h // cell), -(-w // cell)
+
+        full = (self.previous is None or self.previous.shape != small.shape or
+                self.frames_since_full >= self.full_refresh_interval)
+        if full:
+            tiles = np.ones((rows, cols), dtype=bool)
+            self.frames_since_full = 0
+            self.full_refreshes += 1
+        else:
+            diff = cv2.absdiff(small, self.previous)
+            changed = np.zeros((rows * cell, cols * cell), dtype=np.uint16)
+            changed[:h, :w] = diff > self.pixel_threshold
+            counts = changed.reshape(rows, cell, cols, cell).sum(axis=(1, 3))
+            tiles = counts >= self.min_pixels
+            self.frames_since_full += 1
+
+        self.previous = small
+        dirty = DirtyMap(tiles, cell * factor, frame.width, frame.height, full=full)
+        self.frames += 1
+        self.dirty_total += dirty.fraction
+        return dirty
+
+    def reset(self):
+        """下一帧强制整帧刷新（如换房间后）"""
+        self.previous = None
+
+    def report(self):
+        """格式化的变化检测统计"""
+        if self.frames == 0:
+            return "🧩 变化检测: 暂无数据"
+        return (f"🧩 变化检测: 平均脏图块 {self.dirty_total / self.frames * 100:.0f}%, "
+                f"整帧刷新 {self.full_refreshes}/{self.frames} 帧")
+
+
+class TileCache:
+    """单个检测器的图块缓存：干净图块沿用上次结果，只在脏区域重新检测"""
+
+    def __init__(self, halo=32, partial=True):
+        # 重新检测时裁剪区域向外扩展的边距，保证跨越图块边界的目标完整
+        self.halo = halo
+        # False 表示检测器不支持区域检测，有任何变化就整帧重新检测
+        self.partial = partial
+        self.results = None
+        # 跳过的帧累积下来的脏图块，下次运行时一并重新检测
+        self.pending = None
+
+        # 统计：整帧检测、局部检测、完全复用的次数
+        self.full_runs = 0
+        self.partial_runs = 0
+        self.reused = 0
+
+    def run(self, frame, dirty, detect):
+        """detect(frame, region) 返回 [(x, y, ...)]，region 为 None 表示整帧"""
+        frame = Frame.wrap(frame)
+        if dirty is not None and self.pending is not None:
+            dirty = dirty.union(self.pending)
+        self.pending = None
+
+        if dirty is None or dirty.full or self.results is None:
+            self.full_runs += 1
+            self.results = detect(frame, None)
+            return self.results
+
+        if not dirty.any():
+            self.reused += 1
+            return self.results
+
+        if not self.partial:
+            self.full_runs += 1
+            self.results = detect(frame, None)
+            return self.results
+
+        self.partial_runs += 1
+        cores = dirty.rects()
+        h = self.halo
+
+        def inside(point):
+            return any(x0 <= point[0] < x1 and y0 <= point[1] < y1 for x0, y0, x1, y1 in cores)
+
+        # 中心落在干净图块上的目标沿用缓存，脏区域内的目标重新检测
+        results = [r for r in self.results if not inside(r)]
+        for x0, y0, x1, y1 in cores:
+            region = (max(0, x0 - h), max(0, y0 - h), min(frame.width, x1 + h), min(frame.height, y1 + h))
+            # 只保留中心在本区域核心内的结果，扩展边距里的目标由相邻区域或缓存负责
+            results.extend(r for r in detect(frame, region)
+                           if x0 <= r[0] < x1 and y0 <= r[1] < y1)
+
+        self.results = results
+        return results
+
+    def skip(self, dirty):
+        """本帧没有运行检测器：记下变化过的图块，缓存结果在下次运行时修正"""
+        if dirty is not None:
+            self.pending = dirty.union(self.pending)
+
+    def report(self, name):
+        return f"{name} 整帧 {self.full_runs}/局部 {self.partial_runs}/复用 {self.reused}"
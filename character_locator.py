@@ -0,0 +1,191 @@
+"""
+DNF Bot 角色定位
+四种绿色特征（名字文字、光圈、移动路径点、装备光效）的范围都包含在同一个绿色总范围内，
+每帧（每个窗口）先用总范围做一次掩码，共享给所有特征：没有绿色像素时四种特征都直接跳过，
+否则各特征只在绿色像素的外接框（向外留出形态学操作需要的边距）内计算自己的掩码和轮廓表；
+每种特征的轮廓表每帧（每个窗口）最多计算一次，且只在级联检测真正用到该特征时才计算，
+各特征的掩码范围、形态学操作和轮廓判定与原来各自独立的检测方法完全一致
+"""
+
+import cv2
+import numpy as np
+from frame import Frame
+from instrumentation import metrics
+
+# 各特征的绿色范围（HSV）和掩码上的形态学操作 ((操作, 核大小), ...)
+FEATURES = {
+    # 文字：闭运算连接笔画，开运算去掉噪点
+    "text": ((np.array([35, 40, 40]), np.array([85, 255, 255])),
+             ((cv2.MORPH_CLOSE, 3), (cv2.MORPH_OPEN, 3))),
+    "aura": ((np.array([40, 100, 100]), np.array([80, 255, 255])), ()),
+    "path": ((np.array([35, 80, 80]), np.array([85, 255, 255])), ()),
+    # 装备光效：闭运算连接附近的光点
+    "glow": ((np.array([45, 120, 150]), np.array([75, 255, 255])), ((cv2.MORPH_CLOSE, 5),))
+}
+
+# 包含所有特征范围的绿色总范围
+GREEN_BAND = (np.min([band[0] for band, _ in FEATURES.values()], axis=0),
+              np.max([band[1] for band, _ in FEATURES.values()], axis=0))
+
+# 外接框向外留出的边距（像素），大于形态学操作能影响到的范围，保证裁剪后的结果与整帧计算一致
+MARGIN = 16
+
+# 默认的检测顺序（与原来的回退顺序一致）
+HYPOTHESES = ("text", "aura", "path", "glow")
+
+
+class ContourTable:
+    """一帧（或其中一个窗口）单个特征掩码的外轮廓，坐标均为整帧坐标"""
+
+    @metrics.timed("cv2.green_contours")
+    def __init__(self, hsv, band, morph=(), offset=(0, 0)):
+        mask = cv2.inRange(hsv, band[0], band[1])
+        for op, size in morph:
+            mask = cv2.morphologyEx(mask, op, np.ones((size, size), np.uint8))
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+        self.contours = contours
+        self.count = len(contours)
+        self.areas = np.array([cv2.contourArea(c) for c in contours], dtype=np.float64)
+        # (x, y, w, h)
+        self.rects = (np.array([cv2.boundingRect(c) for c in contours], dtype=np.int64)
+                      if contours else np.zeros((0, 4), dtype=np.int64))
+
+    def centroid(self, index):
+        """轮廓重心（按矩计算），面积为 0 时返回 None"""
+        m = cv2.moments(self.contours[index])
+        if m["m00"] == 0:
+            return None
+        return int(m["m10"] / m["m00"]), int(m["m01"] / m["m00"])
+
+    def perimeter(self, index):
+        return cv2.arcLength(self.contours[index], True)
+
+
+@metrics.timed("cv2.green_region")
+def green_region(hsv, offset=(0, 0)):
+    """绿色总范围掩码中非零像素的外接框（加边距，整帧坐标），没有绿色像素时返回 None"""
+    mask = cv2.inRange(hsv, GREEN_BAND[0], GREEN_BAND[1])
+    if not cv2.countNonZero(mask):
+        return None
+    x, y, w, h = cv2.boundingRect(mask)
+    height, width = mask.shape
+    ox, oy = offset
+    return (ox + max(0, x - MARGIN), oy + max(0, y - MARGIN),
+            ox + min(width, x + w + MARGIN), oy + min(height, y + h + MARGIN))
+
+
+class CharacterLocator:
+    """角色定位器：四种绿色特征共用一次绿色总范围掩码"""
+
+    def region(self, frame, roi=None):
+        """本帧（或 roi 窗口内）需要检测的区域，没有绿色像素时为 None（每帧每个窗口只计算一次）
+
+        roi: (x0, y0, x1, y1)，None 表示整帧
+        """
+        frame = Frame.wrap(frame)
+        if roi is None:
+            return frame.memo(("green_region",), lambda: green_region(frame.hsv))
+
+        x0, y0, x1, y1 = roi
+        return frame.memo(("green_region", tuple(roi)),
+                          lambda: green_region(frame.hsv[y0:y1, x0:x1], offset=(x0, y0)))
+
+    def contours(self, frame, name, roi=None):
+        """本帧（或 roi 窗口内）某个特征的轮廓表（每帧每个窗口只计算一次），没有绿色像素时为 None"""
+        frame = Frame.wrap(frame)
+        region = self.region(frame, roi)
+        if region is None:
+            return None
+
+        band, morph = FEATURES[name]
+        x0, y0, x1, y1 = region
+        key = ("green_contours", name) if roi is None else ("green_contours", name, tuple(roi))
+        return frame.memo(key, lambda: ContourTable(frame.hsv[y0:y1, x0:x1], band, morph, offset=(x0, y0)))
+
+    def locate(self, frame, order=HYPOTHESES, roi=None):
+        """按顺序尝试各特征，返回 (位置, 特征名)；都失败返回 (None, None)"""
+        for name in order:
+            pos = self.hypothesis(frame, name, roi)
+            if pos:
+                return pos, name
+        return None, None
+
+    def hypothesis(self, frame, name, roi=None):
+        """在该特征的轮廓表上评估，返回角色位置或 None
+
+        位置合理性（离画面边缘的距离）始终按整帧判断
+        """
+        frame = Frame.wrap(frame)
+        if roi is not None and (roi[2] <= roi[0] or roi[3] <= roi[1]):
+            return None
+        table = self.contours(frame, name, roi)
+        if table is None or table.count == 0:
+            return None
+        scorer = getattr(self, f"_score_{name}")
+        return scorer(table, frame.width, frame.height)
+
+    def _score_text(self, table, width, height):
+        """绿色文字（角色名字或状态文字），角色在文字下方"""
+        center_x, center_y = width // 2, height // 2
+        best_candidate = None
+        best_score = 0
+
+        x, y, w, h = table.rects.T
+        ratio = w / np.maximum(h, 1)
+        candidates = np.nonzero((table.areas > 50) & (table.areas < 1500) &
+                                (h > 0) & (ratio > 1.5) & (ratio < 8) & (w > 20))[0]
+        for i in candidates:
+            # 角色位置：文字下方40像素
+            char_x = int(x[i] + w[i] // 2)
+            char_y = int(y[i] + h[i] + 40)
+            if not (100 < char_x < width - 100 and 100 < char_y < height - 100):
+                continue
+
+            # 得分 = 面积权重 - 距离中心的惩罚
+            distance_from_center = ((char_x - center_x)**2 + (char_y - center_y)**2)**0.5
+            score = float(table.areas[i]) * 0.1 - distance_from_center * 0.01
+            if score > best_score:
+                best_score = score
+                best_candidate = (char_x, char_y)
+
+        return best_candidate
+
+    def _score_aura(self, table, width, height):
+        """角色周围明亮的绿色圆形光圈（按轮廓顺序取第一个）"""
+        candidates = np.nonzero((table.areas > 200) & (table.areas < 3000))[0]
+        for i in candidates:
+            # 检查形状是否接近圆形
+            perimeter = table.perimeter(i)
+            if perimeter <= 0 or 4 * np.pi * table.areas[i] / (perimeter * perimeter) <= 0.3:
+                continue
+            center = table.centroid(i)
+            if center and 150 < center[0] < width - 150 and 150 < center[1] < height - 150:
+                return center
+
+        return None
+
+    def _score_path(self, table, width, height):
+        """移动路径上的小块绿色指示点，取重心"""
+        x, y, w, h = table.rects.T
+        ratio = w / np.maximum(h, 1)
+        dots = ((table.areas > 20) & (table.areas < 500) &
+                (ratio > 0.5) & (ratio < 2.0) & (np.maximum(w, h) < 30))
+
+        indices = np.nonzero(dots)[0]
+        if len(indices) < 2:
+            return None
+
+        centers_x = x[indices] + w[indices] // 2
+        centers_y = y[indices] + h[indices] // 2
+        return (int(centers_x.sum() // len(indices)), int(centers_y.sum() // len(indices)))
+
+    def _score_glow(self, table, width, height):
+        """装备的高亮绿色光效（按轮廓顺序取第一个）"""
+        candidates = np.nonzero((table.areas > 100) & (table.areas < 2000))[0]
+        for i in candidates:
+            center = table.centroid(i)
+            if center and 100 < center[0] < width - 100 and 100 < center[1] < height - 100:
+                return center
+
+        return None
@@ -0,0 +1,163 @@
+"""
+DNF Bot 角色跟踪
+匀速模型的 alpha-beta 滤波（稳态卡尔曼）：结合最近的运动和我们发出的移动指令预测角色位置，
+检测只在预测位置附近的小窗口内进行，置信度下降时才做整帧检测；
+所有时间参数都使用截图时间戳（移动指令按发出指令时所依据的那一帧计时）
+"""
+
+import math
+
+
+class CharacterTracker:
+    """角色位置跟踪器"""
+
+    def __init__(self, search_radius=150, gate_distance=200,
+                 alpha=0.6, beta=0.3, min_confidence=0.4, max_misses=3):
+        # 预测位置周围的搜索半径
+        self.search_radius = search_radius
+        # 与预测偏差超过该距离的检测视为误检（置信度高时）
+        self.gate_distance = gate_distance
+        # 滤波增益：位置修正 alpha，速度修正 beta
+        self.alpha = alpha
+        self.beta = beta
+        self.min_confidence = min_confidence
+        # 局部窗口内连续漏检该次数后回退到整帧检测
+        self.max_misses = max_misses
+
+        self.position = None
+        self.velocity = (0.0, 0.0)
+        # 最近一次被接受的真实检测 (x, y, 时间)，不含滤波和预测
+        self.last_measurement = None
+        self.last_time = None
+        self.confidence = 0.0
+        self.misses = 0
+        # 当前移动指令的结束时间，之后角色视为静止
+        self.command_end = 0.0
+
+        # 统计：局部窗口检测次数/命中次数、整帧检测次数
+        self.window_searches = 0
+        self.window_hits = 0
+        self.full_searches = 0
+
+    def notify_velocity(self, vx, vy, duration, t):
+        """记录发出的移动指令，(vx, vy) 为指令对应的速度（像素/秒）"""
+        if self.position is not None:
+            self._advance(t)
+        command_velocity = (float(vx), float(vy))
+
+        # 与测得的速度融合：指令是先验，观测会继续修正
+        if self.velocity == (0.0, 0.0):
+            self.velocity = command_velocity
+        else:
+            self.velocity = ((self.velocity[0] + command_velocity[0]) / 2,
+                             (self.velocity[1] + command_velocity[1]) / 2)
+        self.command_end = t + duration
+
+    def stop_command(self, t):
+        """移动指令被提前取消"""
+        if self.position is not None:
+            self._advance(t)
+        self.command_end = min(self.command_end, t)
+
+    def predict(self, t):
+        """预测 t 时刻的位置（不修改状态）"""
+        if self.position is None:
+            return None
+        # 只有在移动指令持续期间才按速度外推
+        moving_time = max(0.0, min(t, self.command_end) - self.last_time)
+        return (self.position[0] + self.velocity[0] * moving_time,
+                self.position[1] + self.velocity[1] * moving_time)
+
+    def _advance(self, t):
+        self.position = self.predict(t)
+        self.last_time = t
+        if t >= self.command_end:
+            self.velocity = (0.0, 0.0)
+
+    def needs_full_search(self):
+        """尚未定位或局部窗口内连续漏检时需要整帧检测"""
+        return self.position is None or self.misses >= self.max_misses
+
+    def record_search(self, windowed, found):
+        """记录一次检测走的是局部窗口还是整帧"""
+        if windowed:
+            self.window_searches += 1
+            if found:
+                self.window_hits += 1
+        else:
+            self.full_searches += 1
+
+    def report(self):
+        """格式化的角色检测统计"""
+        total = self.window_searches + self.full_searches
+        if total == 0:
+            return "🎯 角色检测: 暂无数据"
+        hit_rate = self.window_hits / self.window_searches * 100 if self.window_searches else 0.0
+        return (f"🎯 角色检测: 局部窗口 {self.window_searches}/{total} 次 "
+                f"(命中率 {hit_rate:.0f}%), 整帧 {self.full_searches} 次")
+
+    def search_window(self, width, height, t):
+        """预测位置周围的搜索窗口 (x0, y0, x1, y1)"""
+        px, py = self.predict(t)
+        r = self.search_radius
+        return (max(0, int(px - r)), max(0, int(py - r)),
+                min(width, int(px + r)), min(height, int(py + r)))
+
+    def update(self, measurement, t):
+        """用一次检测结果修正状态，返回是否被接受"""
+        mx, my = measurement
+        if self.position is None or self.confidence < self.min_confidence:
+            self.last_measurement = (mx, my, t)
+            # 首次定位或重新捕获：直接采用检测结果
+            self.position = (float(mx), float(my))
+            self.velocity = (0.0, 0.0) if t >= self.command_end else self.velocity
+            self.last_time = t
+            self.confidence = max(self.confidence, self.min_confidence) + 0.2
+            self.misses = 0
+            return True
+
+        dt = t - self.last_time
+        if dt < 0:
+            # 早于上次更新的测量（截图早于已处理的指令），不能让时间倒退
+            return False
+        px, py = self.predict(t)
+        rx, ry = mx - px, my - py
+        if math.hypot(rx, ry) > self.gate_distance:
+            # 偏离预测太远，视为误检
+            self.miss(t)
+            return False
+
+        self.last_measurement = (mx, my, t)
+        moving = t <= self.command_end or self.last_time < self.command_end
+        self.position = (px + self.alpha * rx, py + self.alpha * ry)
+        if moving and dt > 0:
+            self.velocity = (self.velocity[0] + self.beta * rx / dt,
+                             self.velocity[1] + self.beta * ry / dt)
+        else:
+            self.velocity = (0.0, 0.0)
+        self.last_time = t
+        self.confidence = min(1.0, self.confidence + 0.2)
+        self.misses = 0
+        return True
+
+    def miss(self, t):
+        """本帧没有检测到角色：沿用预测位置，降低置信度"""
+        if self.position is None:
+            return
+        self._advance(t)
+        self.confidence *= 0.6
+        self.misses += 1
+
+    def reset(self):
+        """换房间后角色位置会跳变，清空状态重新整帧定位"""
+        self.position = None
+        self.velocity = (0.0, 0.0)
+        self.confidence = 0.0
+        self.misses = 0
+        self.command_end = 0.0
+
+    def current(self):
+        """当前位置（整数坐标），尚未定位时为 None"""
+        if self.position is None:
+            return None
+        return (int(round(self.position[0])), int(round(self.position[1])))
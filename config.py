@@ -11,6 +11,13 @@ GAME_WINDOW = {
     "height": 1200
 }
 
+# 截图配置
+CAPTURE = {
+    "threaded": True,   # 使用后台截图线程
+    "fps": 30,          # 后台截图目标帧率
+    "buffers": 3        # 环形缓冲区槽位数（至少3个）
+}
+
 # 按键配置
 KEYS = {
     "attack": "x",      # 攻击键
@@ -55,9 +62,160 @@ TEMPLATES = {
     "items": ["item1.png", "item2.png"]
 }
 
+# 模板搜索区域 (x0, y0, x1, y1)，取值为画面宽高的比例，表示目标中心可能出现的范围
+# 同一类别的区域不要互相重叠
+SEARCH_REGIONS = {
+    # 传送门位于房间边缘：左右两侧和上方
+    "doors": [(0.0, 0.0, 0.3, 1.0), (0.7, 0.0, 1.0, 1.0), (0.3, 0.0, 0.7, 0.35)],
+    # 掉落物位于地面带
+    "items": [(0.0, 0.35, 1.0, 1.0)]
+}
+
+# 动态搜索区域配置
+ROI_OPTIONS = {
+    "margin": 60,                # 上次命中位置周围的搜索边距（像素）
+    "full_search_interval": 30   # 连续动态搜索多少帧后强制搜索一次完整区域
+}
+
+# 模板匹配引擎配置
+MATCHING = {
+    "pyramid": True,         # 启用金字塔粗到细匹配
+    "pyramid_level": 1,      # 粗匹配层级 (1 = 1/2分辨率, 2 = 1/4分辨率)
+    "coarse_slack": 0.1,     # 粗匹配阈值放宽量
+    "refine_margin": 6,      # 精匹配窗口边距（像素）
+    "max_candidates": 20,    # 每个模板最多精匹配的候选数
+    "max_peaks": 50,         # 每次匹配最多返回的峰值数（与阈值高低无关）
+    "workers": 4             # 同一组模板并行匹配的线程数（1 = 不并行）
+}
+
+# 角色跟踪配置
+TRACKING = {
+    "search_radius": 150,    # 预测位置周围的搜索半径（像素）
+    "gate_distance": 200,    # 偏离预测超过该距离的检测视为误检（像素）
+    "alpha": 0.6,            # 位置修正增益
+    "beta": 0.3,             # 速度修正增益
+    "min_confidence": 0.4,   # 置信度低于该值时下一次检测结果直接采用（重新捕获）
+    "max_misses": 3          # 局部窗口内连续漏检该次数后回退到整帧检测
+}
+
+# 帧差变化检测配置
+CHANGE_DETECTION = {
+    "enabled": True,             # 只在变化的图块上重新检测
+    "tile_size": 64,             # 图块大小（原分辨率像素）
+    "level": 2,                  # 差分使用的金字塔层 (2 = 1/4分辨率)
+    "pixel_threshold": 12,       # 灰度差超过该值的像素视为变化
+    "min_pixels": 2,             # 图块内变化像素数达到该值视为有变化（降采样后）
+    "halo": 32,                  # 局部重新检测时区域向外扩展的边距（像素）
+    "full_refresh_interval": 15  # 每隔多少帧强制整帧检测一次
+}
+
+# 怪物跟踪配置
+MONSTER_TRACKING = {
+    "match_distance": 80,     # 检测与已有目标的最大关联距离（像素）
+    "smoothing": 0.5,         # 位置平滑系数 (0~1，越大越跟随最新检测)
+    "max_misses": 5,          # 已确认目标连续漏检该帧数后删除
+    "min_hits": 2,            # 连续检测到该帧数后才确认为怪物
+    "confirm_margin": 60,     # 已知目标附近确认窗口的边距（像素）
+    "discovery_interval": 10  # 每隔多少帧做一次整帧发现
+}
+
+# 角色档案配置（校准结果按角色保存）
+PROFILE = {
+    "name": "default",     # 默认角色档案名
+    "folder": "profiles",  # 档案保存目录
+    "adapt_rate": 0.2      # 运行中修正实测值的更新系数
+}
+
+# 攻击/拾取动作时长在线测量配置
+ACTION_TIMING = {
+    "radius": 150,        # 以角色为中心观察画面变化的范围（像素）
+    "quiet_tiles": 1,     # 范围内变化图块数不超过该值视为没有变化
+    "settle_frames": 2,   # 连续多少帧没有变化视为动作结束
+    "timeout": 3.0        # 超过该时间仍有变化则放弃本次测量（秒）
+}
+
+# 移动控制配置
+MOVEMENT = {
+    "speed_x": 300,       # 横向移动速度初始估计（像素/秒），运行中根据实际位移修正
+    "speed_y": 200,       # 纵向移动速度初始估计（像素/秒）
+    "axis_deadzone": 10,  # 单个轴剩余距离小于该值时不再按该方向键（像素）
+    "min_hold": 0.05,     # 单次最短按住时间（秒）
+    "max_hold": 0.6,      # 单次最长按住时间（秒），之后用新的检测位置修正方向
+    "adapt_rate": 0.3     # 速度估计更新系数
+}
+
+# 拾取路线配置
+PICKUP = {
+    "match_distance": 40,  # 本帧物品与路线上拾取点的最大关联距离（像素）
+    "two_opt_passes": 10   # 2-opt 改进的最大轮数
+}
+
+# 过图检测配置
+ROOM_TRANSITION = {
+    "level": 3,               # 使用的金字塔层 (3 = 1/8分辨率)
+    "change_threshold": 0.4,  # 与进门前直方图的距离超过该值视为画面切换
+    "dark_ratio": 0.5,        # 平均亮度低于进门前的该比例视为黑屏
+    "start_timeout": 0.8,     # 按键后多久画面没有变化判定为进门失败（秒）
+    "settle_frames": 2        # 新画面连续稳定该帧数后恢复检测
+}
+
+# 刷图状态机：每个状态运行的检测器及其目标频率，不在表中的不运行
+# None = 每帧运行（不受预算限制），正数 = 目标频率（Hz），0 = 只在事件触发后运行（如击杀后检测掉落）
+# 进入新状态的第一帧会运行该状态的所有检测器
+DUNGEON_STATES = {
+    "combat":      {"character": None, "monsters": None, "items": 0, "materials": 0},
+    "loot":        {"character": None, "monsters": 5, "items": None, "materials": 5},
+    "navigate":    {"character": None, "monsters": 5, "items": 2, "materials": 2, "doors": 2},
+    "room_clear":  {"character": None, "monsters": None, "items": None, "materials": None, "doors": None},
+    "dungeon_end": {"monsters": 1, "items": 1, "materials": 1, "doors": 1},
+    "transition":  {}   # 过图期间只由过图检测观察画面
+}
+
+DUNGEON_OPTIONS = {
+    "end_timeout": 15.0   # 房间清空后多久没有发现传送门视为地下城结束（秒）
+}
+
+# 检测器并行执行配置
+DETECTION = {
+    "parallel": True,   # 同一帧上的各检测器并行运行
+    "workers": 4,       # 检测线程数
+    "frame_budget_ms": 60  # 每帧检测耗时预算（各检测器耗时之和，毫秒），超出的检测器推迟到后面的帧
+}
+
+# 调试截图配置（后台线程标注和写盘）
+DEBUG_SCREENSHOTS = {
+    "format": "jpg",         # jpg 或 png
+    "jpeg_quality": 85,      # JPEG 质量 (0-100)
+    "png_compression": 3,    # PNG 压缩级别 (0-9)
+    "thumbnail_width": 0,    # 额外保存的缩略图宽度（像素，0 = 不保存）
+    "queue_size": 4,         # 等待写入的截图数，满时丢弃最旧的
+    "max_files": 200,        # debug_screenshots 中最多保留的截图数（只计 shot_* 文件，0 = 不限制）
+    "max_total_mb": 500      # debug_screenshots 中截图最大总大小（只计 shot_* 文件，MB，0 = 不限制）
+}
+
+# 日志配置
+LOGGING = {
+    "verbosity": "normal",  # quiet = 只输出状态切换和错误, normal = 另外输出动作和定期汇总, debug = 另外输出每帧检测结果
+    "rate_limit": 5.0,      # 同一条消息在该间隔内重复出现时只输出一次（秒，0 = 不限流）
+    "queue_size": 1000,     # 日志队列长度，队列满时丢弃新日志而不阻塞主循环
+    "file": ""              # 同时写入的日志文件（空 = 只输出到控制台）
+}
+
+# 热路径计时配置
+INSTRUMENTATION = {
+    "enabled": False,     # 统计截图、各 cv2 步骤、各检测器、按键动作和主循环每一拍的耗时
+    "window": 500,        # 每个阶段保留最近多少次耗时用于计算 p50/p95/p99
+    "export_path": ""     # 定期把统计追加写入该 JSON Lines 文件（空 = 不导出）
+}
+
+# 模板预加载配置
+TEMPLATE_OPTIONS = {
+    "scales": [1.0, 0.5, 0.25],  # 预计算的模板缩放比例
+    "reload_interval": 2.0       # 模板热重载检查间隔（秒）
+}
+
 # 时间延迟配置 (秒)
 DELAYS = {
-    "movement": 0.3,        # 移动延迟
     "attack": 0.5,          # 攻击延迟
     "pickup": 0.3,          # 拾取延迟
     "door_enter": 2.0,      # 进门等待时间
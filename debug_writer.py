@@ -0,0 +1,152 @@
+"""
+DNF Bot 调试截图后台写入
+主循环只复制一份画面放进有界队列，标注绘制和 JPEG/PNG 编码写盘都在后台线程完成；
+队列满时丢弃最旧的截图（调试截图只关心最近的画面），
+可选额外保存缩略图，并按文件数 / 总大小轮换 debug_screenshots/ 中由写入器生成的截图，长时间运行不会占满磁盘；
+目录中其他文件（如仓库自带、测试和基准程序使用的 debug_*.jpg 样例截图）不受轮换影响
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import cv2
+from bot_logging import get_logger
+
+log = get_logger("debug")
+
+# 轮换时只管理本写入器生成的文件（前缀与仓库自带的 debug_*.jpg 样例截图不同）
+PREFIX = "shot_"
+EXTENSIONS = (".jpg", ".png")
+
+
+class DebugScreenshotWriter(threading.Thread):
+    """调试截图写入线程"""
+
+    def __init__(self, folder, image_format="jpg", jpeg_quality=85, png_compression=3,
+                 thumbnail_width=0, queue_size=4, max_files=200, max_total_mb=500):
+        super().__init__(name="DebugScreenshotWriter", daemon=True)
+        self.folder = folder
+        if image_format not in ("jpg", "png"):
+            raise ValueError(f"不支持的调试截图格式: {image_format}")
+        self.image_format = image_format
+        if image_format == "jpg":
+            self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        else:
+            self.encode_params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        # 缩略图宽度（像素），0 表示不生成
+        self.thumbnail_width = thumbnail_width
+        # 轮换上限，0 表示不限制
+        self.max_files = max_files
+        self.max_bytes = max_total_mb * 1024 * 1024
+
+        self._queue = deque(maxlen=queue_size)
+        self._lock = threading.Lock()
+        self._pending = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+
+        # 已有的调试截图 [(路径, 大小)]，按时间从旧到新，启动时扫描一次
+        self._files = deque(self._scan())
+        self._total_bytes = sum(size for _, size in self._files)
+
+        # 统计计数
+        self.written = 0
+        self.dropped = 0
+        self.removed = 0
+        self.write_ms = 0.0
+
+    def _scan(self):
+        try:
+            names = [name for name in os.listdir(self.folder)
+                     if name.startswith(PREFIX) and name.endswith(EXTENSIONS)]
+        except OSError:
+            return []
+        files = []
+        for name in names:
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+        return [(path, size) for _, path, size in sorted(files)]
+
+    def submit(self, image, annotate=None, name=None):
+        """提交一张截图（立即复制，调用方可继续复用 image 的缓冲区）
+
+        annotate: 在后台线程对副本调用 annotate(image) 绘制标注
+        name: 文件名（不含扩展名），默认按提交时间生成
+        返回文件名；队列满时最旧的一张被丢弃
+        """
+        if name is None:
+            name = f"{PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}"
+        filename = f"{name}.{self.image_format}"
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append((image.copy(), annotate, filename))
+            self._pending.notify()
+        return filename
+
+    def run(self):
+        while True:
+            with self._lock:
+                self._pending.wait_for(lambda: self._queue or self._stop_event.is_set())
+                if not self._queue:
+                    return
+                image, annotate, filename = self._queue.popleft()
+            try:
+                self._write(image, annotate, filename)
+            except Exception as e:
+                log.error("❌ 调试截图保存失败 %s: %s", filename, e)
+
+    def _write(self, image, annotate, filename):
+        start = time.perf_counter()
+        if annotate is not None:
+            annotate(image)
+
+        path = os.path.join(self.folder, filename)
+        outputs = [(path, image)]
+        if self.thumbnail_width and image.shape[1] > self.thumbnail_width:
+            height = max(1, image.shape[0] * self.thumbnail_width // image.shape[1])
+            thumbnail = cv2.resize(image, (self.thumbnail_width, height), interpolation=cv2.INTER_AREA)
+            root, ext = os.path.splitext(path)
+            outputs.append((f"{root}_thumb{ext}", thumbnail))
+
+        for output_path, output in outputs:
+            if not cv2.imwrite(output_path, output, self.encode_params):
+                raise OSError(f"无法写入 {output_path}")
+            size = os.path.getsize(output_path)
+            self._files.append((output_path, size))
+            self._total_bytes += size
+
+        self._rotate()
+        self.written += 1
+        self.write_ms += (time.perf_counter() - start) * 1000
+        log.info("📸 调试截图已保存: %s", filename)
+
+    def _rotate(self):
+        """超过文件数或总大小上限时删除最旧的截图"""
+        while self._files and ((self.max_files and len(self._files) > self.max_files) or
+                               (self.max_bytes and self._total_bytes > self.max_bytes)):
+            path, size = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+                self.removed += 1
+            except OSError:
+                pass
+
+    def stop(self, timeout=5.0):
+        """写完队列中剩余的截图后停止"""
+        self._stop_event.set()
+        with self._lock:
+            self._pending.notify_all()
+        if self.is_alive():
+            self.join(timeout)
+
+    def report(self):
+        average = self.write_ms / self.written if self.written else 0.0
+        return (f"📸 调试截图: 已保存 {self.written} 张 (平均 {average:.0f}ms), 丢弃 {self.dropped} 张, "
+                f"轮换删除 {self.removed} 个文件, 目录占用 {self._total_bytes / 1024 / 1024:.1f}MB")
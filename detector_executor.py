@@ -0,0 +1,71 @@
+"""
+DNF Bot 检测器并行执行
+同一帧上互不依赖的检测器（怪物、物品、门、角色）放到线程池并行运行，
+OpenCV 的 inRange / findContours / matchTemplate 执行时会释放 GIL，
+一帧的检测耗时约等于最慢的那个检测器
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import metrics
+from bot_logging import get_logger
+
+log = get_logger("detect")
+
+
+class DetectorExecutor:
+    """在共享帧上并行运行一组检测器，并记录每个检测器的耗时"""
+
+    def __init__(self, max_workers=4, parallel=True):
+        self.parallel = parallel and max_workers > 1
+        self.pool = None
+        if self.parallel:
+            self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Detector")
+
+        # {检测器名: 最近耗时(毫秒)}
+        self.timings = {}
+        self.frame_times = deque(maxlen=120)
+
+    def _timed(self, name, detector, frame):
+        start = time.perf_counter()
+        try:
+            result = detector(frame)
+        except Exception as e:
+            log.error("❌ 检测器 %s 出错: %s", name, e)
+            result = []
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.record(f"detector.{name}", elapsed)
+        return result, elapsed
+
+    def run(self, frame, detectors):
+        """运行检测器 {名称: 函数(frame)}，返回 ({名称: 结果}, {名称: 耗时毫秒})"""
+        start = time.perf_counter()
+
+        if self.pool is not None:
+            futures = {name: self.pool.submit(self._timed, name, detector, frame)
+                       for name, detector in detectors.items()}
+            outputs = {name: future.result() for name, future in futures.items()}
+        else:
+            outputs = {name: self._timed(name, detector, frame)
+                       for name, detector in detectors.items()}
+
+        results = {name: output[0] for name, output in outputs.items()}
+        timings = {name: output[1] for name, output in outputs.items()}
+
+        for name, elapsed in timings.items():
+            self.timings.setdefault(name, deque(maxlen=120)).append(elapsed)
+        self.frame_times.append((time.perf_counter() - start) * 1000)
+        return results, timings
+
+    def report(self):
+        """格式化的检测耗时报告（最近若干帧的平均值）"""
+        if not self.frame_times:
+            return "🔍 检测耗时: 暂无数据"
+        parts = [f"{name} {sum(t) / len(t):.1f}ms" for name, t in self.timings.items() if t]
+        total = sum(self.frame_times) / len(self.frame_times)
+        return f"🔍 检测耗时: 每帧 {total:.1f}ms ({', '.join(parts)})"
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
@@ -0,0 +1,104 @@
+"""
+DNF Bot 检测器调度
+每个检测器在每个刷图状态下声明目标频率（每帧 / 若干 Hz / 只在事件触发后），
+调度器按实测耗时估算每帧的 CPU 开销，在预算内挑选本帧要运行的检测器，其余沿用缓存结果；
+被预算挤掉的检测器越逾期优先级越高，每帧至少运行最紧急的一个，不会一直饿死；
+决定当前状态去留的检测器（如寻路状态的传送门检测）到期时不受预算限制，避免状态因结果未知而来回切换
+"""
+
+import time
+
+# 频率取值：None = 每帧运行（不受预算限制），正数 = 目标频率（Hz），0 = 只在事件触发后运行
+EVERY_FRAME = None
+ON_EVENT = 0
+
+
+class DetectorScheduler:
+    """按状态和 CPU 预算选择每帧运行的检测器"""
+
+    def __init__(self, rates, budget_ms=60.0, cost_smoothing=0.3, deciding=None):
+        # {状态: {检测器名: 频率}}，不在表中的检测器该状态下不运行
+        self.rates = rates
+        # {状态: 检测器名}，该检测器到期时总是运行
+        self.deciding = deciding or {}
+        # 每帧检测耗时预算（各检测器耗时之和，毫秒）
+        self.budget_ms = budget_ms
+        self.cost_smoothing = cost_smoothing
+
+        # {检测器名: 上次运行时间 / 平均耗时(毫秒)}
+        self.last_run = {}
+        self.cost_ms = {}
+        # 事件触发后等待运行的检测器
+        self.triggered = set()
+
+        # 统计：运行次数、因预算被推迟的次数
+        self.runs = {}
+        self.deferred = {}
+
+    def trigger(self, *names):
+        """事件发生（如击杀怪物后检测掉落），下一帧运行这些检测器"""
+        self.triggered.update(names)
+
+    def select(self, state, state_entered, now=None):
+        """本帧要运行的检测器名
+
+        进入新状态后还没运行过的检测器立即到期，保证状态切换后的第一帧结果是新的
+        """
+        now = now if now is not None else time.time()
+        rates = self.rates.get(state, {})
+        deciding = self.deciding.get(state)
+
+        required = []
+        due = []
+        for order, (name, rate) in enumerate(rates.items()):
+            last = self.last_run.get(name)
+            if rate is EVERY_FRAME:
+                required.append(name)
+                continue
+            if last is None or last < state_entered or name in self.triggered:
+                # 新状态第一次运行或事件触发：最高优先级
+                priority = float("inf")
+            elif rate > 0 and now - last >= 1.0 / rate:
+                # 逾期越久优先级越高
+                priority = (now - last) * rate
+            else:
+                continue
+            if name == deciding:
+                required.append(name)
+            else:
+                # 优先级相同时按配置中的声明顺序
+                due.append((-priority, order, name))
+
+        selected = list(required)
+        spent = sum(self.cost_ms.get(name, 0.0) for name in required)
+        for rank, (_, _, name) in enumerate(sorted(due)):
+            cost = self.cost_ms.get(name, 0.0)
+            # 最紧急的那个总是运行，避免每帧必跑的检测器占满预算时其他检测器被饿死
+            if rank > 0 and spent + cost > self.budget_ms:
+                self.deferred[name] = self.deferred.get(name, 0) + 1
+                continue
+            selected.append(name)
+            spent += cost
+        return selected
+
+    def record(self, timings, now=None):
+        """记录本帧运行的检测器耗时 {名称: 毫秒}"""
+        now = now if now is not None else time.time()
+        for name, elapsed in timings.items():
+            self.last_run[name] = now
+            previous = self.cost_ms.get(name)
+            if previous is None:
+                self.cost_ms[name] = elapsed
+            else:
+                self.cost_ms[name] = previous + self.cost_smoothing * (elapsed - previous)
+            self.runs[name] = self.runs.get(name, 0) + 1
+            self.triggered.discard(name)
+
+    def report(self):
+        """格式化的调度统计"""
+        if not self.runs:
+            return "⏱️ 检测调度: 暂无数据"
+        parts = [f"{name} {self.runs[name]}次/{self.cost_ms.get(name, 0.0):.1f}ms"
+                 + (f"/推迟{self.deferred[name]}次" if self.deferred.get(name) else "")
+                 for name in sorted(self.runs)]
+        return f"⏱️ 检测调度 (预算 {self.budget_ms:.0f}ms): {', '.join(parts)}"
@@ -1,27 +1,60 @@
 import cv2
+import logging
 import pyautogui
 import numpy as np
-from PIL import Image
 import time
 import keyboard
-from mss import mss
 import os
 import sys
 import config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from template_registry import TemplateRegistry
+from frame import Frame
+from screen_capture import ScreenCapture
+from capture_thread import CaptureThread
+from input_scheduler import InputScheduler
+from search_regions import SearchRegionTracker
+from template_matcher import PyramidMatcher
+from detector_executor import DetectorExecutor
+from character_locator import CharacterLocator
+from character_tracker import CharacterTracker
+from change_detector import ChangeDetector, TileCache
+from monster_tracker import MonsterTracker
+import spatial
+from route_planner import PickupPlanner
+from movement_controller import MovementController
+from calibration import TimingProfile, Calibrator, ActionTimer
+from room_transition import RoomTransitionDetector
+import dungeon_state
+from dungeon_state import DungeonStateMachine
+from detector_scheduler import DetectorScheduler
+from instrumentation import metrics
+from debug_writer import DebugScreenshotWriter
+from bot_logging import get_logger, setup_logging, shutdown_logging, dropped_count
+
+log = get_logger("bot")
+detect_log = get_logger("detect")
+action_log = get_logger("action")
+report_log = get_logger("report")
+state_log = get_logger("state")
 
 class DNFBot:
-    def __init__(self):
+    def __init__(self, profile_name=None, verbosity=None):
+        # 日志（热路径只把记录放进队列，后台线程输出）
+        setup_logging(verbosity=verbosity or config.LOGGING["verbosity"],
+                      rate_limit=config.LOGGING["rate_limit"],
+                      queue_size=config.LOGGING["queue_size"],
+                      log_file=config.LOGGING["file"] or None)
+        
         # 禁用PyAutoGUI的安全功能
         pyautogui.FAILSAFE = False
-        pyautogui.PAUSE = 0.1
+        # 按键时序完全由 InputScheduler 控制，每次按键调用后不再额外等待
+        pyautogui.PAUSE = 0
         
         # 配置引用
         self.config = config
         
-        # 屏幕截图对象
-        self.sct = mss()
-        
         # 获取程序运行目录（支持打包后的exe）
         if getattr(sys, 'frozen', False):
             # 如果是打包后的exe
@@ -33,10 +66,170 @@ class DNFBot:
         # 游戏窗口区域（从配置文件读取）
         self.game_region = self.config.GAME_WINDOW
         
+        # 屏幕截图对象（零拷贝截图，复用输出缓冲区）
+        self.capture = ScreenCapture(self.game_region)
+        
+        # 后台截图线程（主循环运行时启动）
+        self.capture_thread = None
+        self.last_frame_seq = 0
+        
+        # 预加载所有模板（检测时不再读取磁盘）
+        self.templates = TemplateRegistry(
+            os.path.join(self.base_path, "templates"),
+            self.config.TEMPLATES,
+            scales=self.config.TEMPLATE_OPTIONS["scales"],
+            reload_interval=self.config.TEMPLATE_OPTIONS["reload_interval"]
+        )
+        
+        # 模板搜索区域（按类别的静态区域 + 上次命中附近的动态区域）
+        self.search_regions = SearchRegionTracker(
+            self.config.SEARCH_REGIONS,
+            margin=self.config.ROI_OPTIONS["margin"],
+            full_search_interval=self.config.ROI_OPTIONS["full_search_interval"]
+        )
+        
+        # 金字塔模板匹配引擎（关闭时退化为原分辨率全图匹配）
+        self.matcher = PyramidMatcher(
+            level=self.config.MATCHING["pyramid_level"] if self.config.MATCHING["pyramid"] else 0,
+            coarse_slack=self.config.MATCHING["coarse_slack"],
+            refine_margin=self.config.MATCHING["refine_margin"],
+            max_candidates=self.config.MATCHING["max_candidates"],
+            min_distance=self.config.THRESHOLDS["duplicate_distance"],
+            max_peaks=self.config.MATCHING["max_peaks"]
+        )
+        
+        # 同一组模板并行匹配的线程池
+        self.match_pool = None
+        if self.config.MATCHING["workers"] > 1:
+            self.match_pool = ThreadPoolExecutor(max_workers=self.config.MATCHING["workers"],
+                                                 thread_name_prefix="TemplateMatch")
+        
         # 技能键设置（从配置文件读取）
         self.attack_key = self.config.KEYS["attack"]
         self.pickup_key = self.config.KEYS["pickup"]
         
+        # 角色定位（四种绿色特征共用一次绿色总范围掩码，各自只在绿色区域内找轮廓）
+        self.locator = CharacterLocator()
+        
+        # 角色位置跟踪（预测位置附近搜索，置信度低时整帧检测）
+        self.tracker = CharacterTracker(
+            search_radius=self.config.TRACKING["search_radius"],
+            gate_distance=self.config.TRACKING["gate_distance"],
+            alpha=self.config.TRACKING["alpha"],
+            beta=self.config.TRACKING["beta"],
+            min_confidence=self.config.TRACKING["min_confidence"],
+            max_misses=self.config.TRACKING["max_misses"]
+        )
+        
+        # 帧差变化检测：检测器只在变化的图块上重新运行
+        self.changes = None
+        self.tile_caches = {}
+        if self.config.CHANGE_DETECTION["enabled"]:
+            self.changes = ChangeDetector(
+                tile_size=self.config.CHANGE_DETECTION["tile_size"],
+                level=self.config.CHANGE_DETECTION["level"],
+                pixel_threshold=self.config.CHANGE_DETECTION["pixel_threshold"],
+                min_pixels=self.config.CHANGE_DETECTION["min_pixels"],
+                full_refresh_interval=self.config.CHANGE_DETECTION["full_refresh_interval"]
+            )
+            halo = self.config.CHANGE_DETECTION["halo"]
+            self.tile_caches = {
+                "monsters": TileCache(halo),
+                "items": TileCache(halo),
+                # 材料和门使用模板匹配和自己的搜索区域，画面有变化时整帧重新检测
+                "materials": TileCache(halo, partial=False),
+                "doors": TileCache(halo, partial=False)
+            }
+        
+        # 怪物跟踪（稳定编号，攻击锁定同一目标）
+        self.monster_tracker = MonsterTracker(
+            match_distance=self.config.MONSTER_TRACKING["match_distance"],
+            smoothing=self.config.MONSTER_TRACKING["smoothing"],
+            max_misses=self.config.MONSTER_TRACKING["max_misses"],
+            min_hits=self.config.MONSTER_TRACKING["min_hits"],
+            confirm_margin=self.config.MONSTER_TRACKING["confirm_margin"],
+            discovery_interval=self.config.MONSTER_TRACKING["discovery_interval"]
+        )
+        
+        # 角色档案：校准实测的移动速度和动作时长（没有档案时使用配置中的默认值）
+        profile_name = profile_name or self.config.PROFILE["name"]
+        if getattr(sys, 'frozen', False):
+            profile_root = os.path.dirname(sys.executable)
+        else:
+            profile_root = self.base_path
+        self.profile = TimingProfile(
+            os.path.join(profile_root, self.config.PROFILE["folder"], f"{profile_name}.json"),
+            {
+                "speed_x": self.config.MOVEMENT["speed_x"],
+                "speed_y": self.config.MOVEMENT["speed_y"],
+                "attack": self.config.DELAYS["attack"],
+                "pickup": self.config.DELAYS["pickup"],
+                "door_enter": self.config.DELAYS["door_enter"],
+                "main_loop": self.config.DELAYS["main_loop"]
+            },
+            adapt_rate=self.config.PROFILE["adapt_rate"]
+        )
+        if self.profile.load():
+            log.info("👤 已加载角色档案 %s: %s", profile_name, self.profile.summary())
+        else:
+            log.info("👤 角色档案 %s 未校准，使用默认参数（运行 --calibrate 校准）", profile_name)
+        
+        # 移动控制（斜向组合键，按住时间由测得的移动速度算出）
+        self.movement = MovementController(
+            speed_x=self.profile["speed_x"],
+            speed_y=self.profile["speed_y"],
+            arrive_distance=self.config.THRESHOLDS["movement_threshold"],
+            axis_deadzone=self.config.MOVEMENT["axis_deadzone"],
+            min_hold=self.config.MOVEMENT["min_hold"],
+            max_hold=self.config.MOVEMENT["max_hold"],
+            adapt_rate=self.config.MOVEMENT["adapt_rate"],
+            reference_x=self.profile.baseline["speed_x"],
+            reference_y=self.profile.baseline["speed_y"]
+        )
+        
+        # 攻击/拾取动作实际时长的在线测量（修正角色档案中的动作时长）
+        self.action_timer = ActionTimer(
+            radius=self.config.ACTION_TIMING["radius"],
+            quiet_tiles=self.config.ACTION_TIMING["quiet_tiles"],
+            settle_frames=self.config.ACTION_TIMING["settle_frames"],
+            timeout=self.config.ACTION_TIMING["timeout"]
+        )
+        
+        # 拾取路线（金币和材料合并规划，跨帧保持）
+        self.pickup_planner = PickupPlanner(
+            match_distance=self.config.PICKUP["match_distance"],
+            max_passes=self.config.PICKUP["two_opt_passes"]
+        )
+        
+        # 过图检测（画面切换完成立即恢复检测，进门失败马上重试）
+        self.transition = RoomTransitionDetector(
+            level=self.config.ROOM_TRANSITION["level"],
+            change_threshold=self.config.ROOM_TRANSITION["change_threshold"],
+            dark_ratio=self.config.ROOM_TRANSITION["dark_ratio"],
+            start_timeout=self.config.ROOM_TRANSITION["start_timeout"],
+            settle_frames=self.config.ROOM_TRANSITION["settle_frames"]
+        )
+        
+        # 刷图状态机
+        self.state = DungeonStateMachine(end_timeout=self.config.DUNGEON_OPTIONS["end_timeout"])
+        
+        # 检测器调度（每个状态只运行需要的检测器，按目标频率和每帧耗时预算挑选）
+        self.scheduler = DetectorScheduler(self.config.DUNGEON_STATES,
+                                           deciding=dungeon_state.DECIDING_DETECTORS,
+                                           budget_ms=self.config.DETECTION["frame_budget_ms"])
+        
+        # 检测器并行执行（同一帧上的怪物/物品/门/角色检测同时进行）
+        self.detectors = DetectorExecutor(max_workers=self.config.DETECTION["workers"],
+                                          parallel=self.config.DETECTION["parallel"])
+        
+        # 热路径计时（关闭时几乎没有开销）
+        metrics.configure(enabled=self.config.INSTRUMENTATION["enabled"],
+                          window=self.config.INSTRUMENTATION["window"],
+                          export_path=self.config.INSTRUMENTATION["export_path"])
+        
+        # 非阻塞输入调度（按键在独立线程按时序执行）
+        self.input = InputScheduler(pyautogui.keyDown, pyautogui.keyUp)
+        
         # 运行状态
         self.running = False
         
@@ -53,131 +246,131 @@ class DNFBot:
         try:
             if not os.path.exists(self.debug_folder):
                 os.makedirs(self.debug_folder)
-            print(f"📸 调试截图保存路径: {self.debug_folder}")
+            log.info("📸 调试截图保存路径: %s", self.debug_folder)
         except Exception as e:
             # 如果无法创建，则使用当前工作目录
             self.debug_folder = os.path.join(os.getcwd(), "debug_screenshots")
             if not os.path.exists(self.debug_folder):
                 os.makedirs(self.debug_folder)
-            print(f"⚠️  调试截图保存到工作目录: {self.debug_folder}")
+            log.warning("⚠️  调试截图保存到工作目录: %s", self.debug_folder)
         
         self.last_debug_time = 0
         self.debug_interval = 10  # 10秒间隔
         
+        # 调试截图后台写入（标注和编码不在主循环中进行）
+        options = self.config.DEBUG_SCREENSHOTS
+        self.debug_writer = DebugScreenshotWriter(
+            self.debug_folder,
+            image_format=options["format"],
+            jpeg_quality=options["jpeg_quality"],
+            png_compression=options["png_compression"],
+            thumbnail_width=options["thumbnail_width"],
+            queue_size=options["queue_size"],
+            max_files=options["max_files"],
+            max_total_mb=options["max_total_mb"]
+        )
+        self.debug_writer.start()
+        self.last_capture_report_time = time.time()
+        
     def capture_screen(self):
         """截取游戏屏幕"""
-        screenshot = self.sct.grab(self.game_region)
-        img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-        return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+        return self.capture.grab()
     
-    def find_template(self, screen, template_path, threshold=0.8):
-        """模板匹配查找目标"""
-        try:
-            template = cv2.imread(template_path, 0)
-            if template is None:
-                print(f"警告: 无法加载模板图片: {template_path}")
-                return []
-                
-            screen_gray = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
-            
-            result = cv2.matchTemplate(screen_gray, template, cv2.TM_CCOEFF_NORMED)
-            locations = np.where(result >= threshold)
-            
-            matches = []
-            for pt in zip(*locations[::-1]):
-                matches.append((pt[0] + template.shape[1]//2, pt[1] + template.shape[0]//2))
-            
-            return matches
-        except Exception as e:
-            print(f"模板匹配错误 {template_path}: {e}")
-            return []
-    
-    def find_multiple_templates(self, screen, template_names, threshold=0.7):
-        """改进的多模板匹配，提高精确度"""
-        all_matches = []
+    def capture_frame(self):
+        """获取最新一帧（同一帧内共享颜色转换结果）
         
-        for template_name in template_names:
-            template_path = os.path.join(self.base_path, "templates", template_name)
-            if not os.path.exists(template_path):
-                print(f"警告: 模板文件不存在: {template_path}")
-                continue
-            
-            matches = self.find_template_improved(screen, template_path, threshold)
-            if matches:
-                print(f"✅ 使用模板 {template_name} 找到 {len(matches)} 个目标")
-                all_matches.extend(matches)
+        后台截图线程运行时取环形缓冲区中的最新帧，否则同步截图
+        """
+        if self.capture_thread is not None and self.capture_thread.is_alive():
+            frame = self.capture_thread.latest(newer_than=self.last_frame_seq)
+            if frame is None:
+                return None
+        else:
+            frame = Frame(self.capture_screen(), seq=self.last_frame_seq + 1)
         
-        # 去重：移除距离过近的重复检测
-        if len(all_matches) > 1:
-            unique_matches = self.remove_duplicate_matches(all_matches)
-            return unique_matches
+        self.last_frame_seq = frame.seq
+        return frame
+    
+    def start_capture_thread(self):
+        """启动后台截图线程"""
+        if not self.config.CAPTURE["threaded"]:
+            return
+        if self.capture_thread is not None and self.capture_thread.is_alive():
+            return
         
-        return all_matches
+        self.capture_thread = CaptureThread(self.game_region,
+                                            fps=self.config.CAPTURE["fps"],
+                                            buffer_count=self.config.CAPTURE["buffers"])
+        self.capture_thread.start()
+        log.info("📷 后台截图线程已启动 (%s FPS)", self.config.CAPTURE['fps'])
+    
+    def stop_capture_thread(self):
+        """停止后台截图线程"""
+        if self.capture_thread is not None:
+            self.capture_thread.stop()
+            report_log.info(self.capture_thread.report())
+            self.capture_thread = None
     
-    def find_template_improved(self, screen, template_path, threshold=0.7):
-        """改进的单模板匹配"""
+    def find_multiple_templates(self, frame, template_names, threshold=0.7, group=None):
+        """改进的多模板匹配，提高精确度
+        
+        整组模板在同一张预处理好的截图上批量匹配，返回 [(x, y, confidence, 模板名)]；
+        group: 模板类别（doors / items），指定时只在该类的搜索区域内匹配
+        """
+        frame = Frame.wrap(frame)
+        entries = [self.templates.get(name) for name in template_names]
+        entries = [entry for entry in entries if entry is not None]
+        if not entries:
+            return []
+        
+        regions = None
+        if group is not None:
+            regions = {entry.name: self.search_regions.regions(group, entry.name, frame.width, frame.height,
+                                                               entry.width, entry.height)
+                       for entry in entries}
+        
         try:
-            # 加载模板（彩色）
-            template = cv2.imread(template_path)
-            if template is None:
-                print(f"警告: 无法加载模板图片: {template_path}")
-                return []
-            
-            # 获取模板尺寸
-            h, w = template.shape[:2]
-            
-            # 方法1: 彩色模板匹配
-            color_matches = self.match_color_template(screen, template, threshold)
-            
-            # 方法2: 灰度模板匹配（作为备用）
-            gray_matches = self.match_gray_template(screen, template, threshold)
-            
-            # 合并结果，优先使用彩色匹配
-            all_matches = color_matches if color_matches else gray_matches
-            
-            # 验证匹配质量
-            validated_matches = []
-            for match in all_matches:
-                x, y, confidence = match
-                if self.validate_match_region(screen, template, x, y):
-                    validated_matches.append((x + w//2, y + h//2, confidence))
-            
-            return validated_matches
+            # 方法1: 彩色模板批量匹配
+            all_matches = self.matcher.match_set(frame, entries, threshold, regions,
+                                                 executor=self.match_pool)
             
+            # 方法2: 灰度模板匹配（作为备用，只对彩色匹配没有结果的模板执行）
+            found = {match[3] for match in all_matches}
+            missing = [entry for entry in entries if entry.name not in found]
+            if missing:
+                all_matches += self.matcher.match_set(frame, missing, threshold, regions,
+                                                      use_gray=True, executor=self.match_pool)
         except Exception as e:
-            print(f"模板匹配出错: {e}")
+            detect_log.error("模板匹配出错: %s", e)
             return []
-    
-    def match_color_template(self, screen, template, threshold):
-        """彩色模板匹配"""
-        res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-        locations = np.where(res >= threshold)
         
-        matches = []
-        for y, x in zip(locations[0], locations[1]):
-            confidence = res[y, x]
-            matches.append((x, y, confidence))
+        # 验证匹配质量
+        by_name = {entry.name: entry for entry in entries}
+        validated_matches = []
+        for x, y, confidence, name in all_matches:
+            entry = by_name[name]
+            if self.validate_match_region(frame, entry.color, x - entry.width//2, y - entry.height//2):
+                validated_matches.append((x, y, confidence, name))
         
-        return matches
-    
-    def match_gray_template(self, screen, template, threshold):
-        """灰度模板匹配"""
-        screen_gray = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
-        template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        counts = {}
+        for match in validated_matches:
+            counts[match[3]] = counts.get(match[3], 0) + 1
+        for entry in entries:
+            if group is not None:
+                self.search_regions.update(entry.name, [m for m in validated_matches if m[3] == entry.name])
+            if entry.name in counts:
+                detect_log.debug("✅ 使用模板 %s 找到 %d 个目标", entry.name, counts[entry.name])
         
-        res = cv2.matchTemplate(screen_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        locations = np.where(res >= threshold)
+        # 去重：不同模板在同一位置的命中只保留置信度最高的
+        if len(validated_matches) > 1:
+            return self.remove_duplicate_matches(validated_matches)
         
-        matches = []
-        for y, x in zip(locations[0], locations[1]):
-            confidence = res[y, x]
-            matches.append((x, y, confidence))
-        
-        return matches
+        return validated_matches
     
-    def validate_match_region(self, screen, template, x, y):
+    def validate_match_region(self, frame, template, x, y):
         """验证匹配区域的质量"""
         try:
+            screen = Frame.wrap(frame).image
             h, w = template.shape[:2]
             
             # 检查边界
@@ -201,37 +394,21 @@ class DNFBot:
             return False
     
     def remove_duplicate_matches(self, matches):
-        """移除重复的匹配结果"""
-        if not matches:
-            return []
-        
-        # 按confidence排序，保留最佳匹配
-        sorted_matches = sorted(matches, key=lambda x: x[2] if len(x) > 2 else 0, reverse=True)
-        
-        unique_matches = []
-        min_distance = self.config.THRESHOLDS["duplicate_distance"]
-        
-        for match in sorted_matches:
-            x, y = match[0], match[1]
-            is_duplicate = False
-            
-            for unique_match in unique_matches:
-                ux, uy = unique_match[0], unique_match[1]
-                distance = np.sqrt((x - ux)**2 + (y - uy)**2)
-                
-                if distance < min_distance:
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                unique_matches.append(match)
-        
-        return unique_matches
+        """移除重复的匹配结果（按置信度保留最佳匹配，网格分桶去重）"""
+        return spatial.suppress_duplicates(matches, self.config.THRESHOLDS["duplicate_distance"])
     
-    def detect_monsters(self, screen):
+    def crop_hsv(self, frame, region=None):
+        """帧的HSV图（帧内缓存），region 不为 None 时返回该区域及其左上角偏移"""
+        hsv = Frame.wrap(frame).hsv
+        if region is None:
+            return hsv, (0, 0)
+        x0, y0, x1, y1 = region
+        return hsv[y0:y1, x0:x1], (x0, y0)
+    
+    def detect_monsters(self, frame, region=None):
         """检测怪物 - 基础版本使用颜色检测"""
-        # 转换到HSV色彩空间
-        hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
+        # HSV色彩空间（帧内缓存）
+        hsv, offset = self.crop_hsv(frame, region)
         
         # 定义红色血条的HSV范围（怪物血条通常是红色）
         lower_red1 = np.array([0, 120, 70])
@@ -240,12 +417,14 @@ class DNFBot:
         upper_red2 = np.array([180, 255, 255])
         
         # 创建掩码
-        mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-        mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-        mask = mask1 + mask2
+        with metrics.timer("cv2.in_range"):
+            mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
+            mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
+            mask = mask1 + mask2
         
-        # 查找轮廓
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # 查找轮廓（坐标换算为整帧）
+        with metrics.timer("cv2.find_contours"):
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
         
         monsters = []
         for contour in contours:
@@ -256,43 +435,46 @@ class DNFBot:
         
         return monsters
     
-    def detect_items(self, screen):
+    def detect_items(self, frame, region=None):
         """检测掉落物品 - 目前仅检测金币"""
         # 只检测金币（通过颜色检测）
-        coins = self.detect_coins(screen)
+        coins = self.detect_coins(frame, region)
         return coins
     
-    def detect_materials(self, screen):
+    def detect_materials(self, frame):
         """检测材料物品 - 使用模板匹配"""
         materials = []
         
         # 使用物品模板匹配
-        item_templates = ["item1.png", "item2.png"]
-        template_items = self.find_multiple_templates(screen, item_templates, 
-                                                     self.config.THRESHOLDS["item_template"])
+        item_templates = self.config.TEMPLATES["items"]
+        template_items = self.find_multiple_templates(frame, item_templates, 
+                                                     self.config.THRESHOLDS["item_template"],
+                                                     group="items")
         
         # 转换格式，只保留坐标
         for item in template_items:
             materials.append((item[0], item[1]))
             
         if materials:
-            print(f"🎁 检测到 {len(materials)} 个材料")
+            detect_log.debug("🎁 检测到 %d 个材料", len(materials))
         
         return materials
     
-    def detect_coins(self, screen):
+    def detect_coins(self, frame, region=None):
         """检测金币 - 使用颜色检测"""
         coins = []
         
         # 颜色检测金币（黄色/金色）
-        hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
+        hsv, offset = self.crop_hsv(frame, region)
         
         # 检测金币颜色范围
         lower_gold = np.array(self.config.COLORS["gold_coins"]["lower"])
         upper_gold = np.array(self.config.COLORS["gold_coins"]["upper"])
-        mask = cv2.inRange(hsv, lower_gold, upper_gold)
+        with metrics.timer("cv2.in_range"):
+            mask = cv2.inRange(hsv, lower_gold, upper_gold)
         
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        with metrics.timer("cv2.find_contours"):
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
         
         for contour in contours:
             area = cv2.contourArea(contour)
@@ -301,365 +483,357 @@ class DNFBot:
                 coins.append((x + w//2, y + h//2))
         
         if coins:
-            print(f"💰 检测到 {len(coins)} 个金币")
+            detect_log.debug("💰 检测到 %d 个金币", len(coins))
         
         return coins
     
-    def detect_doors(self, screen):
+    def detect_doors(self, frame):
         """检测传送门 - 支持多种门的模板"""
         # 支持4种不同的门模板
-        door_templates = ["door1.png", "door2.png", "door3.png", "door4.png"]
-        door_matches = self.find_multiple_templates(screen, door_templates, 0.7)
+        door_templates = self.config.TEMPLATES["doors"]
+        door_matches = self.find_multiple_templates(frame, door_templates, 
+                                                    self.config.THRESHOLDS["door_template"],
+                                                    group="doors")
         
-        if door_matches:
-            print(f"🚪 找到 {len(door_matches)} 个传送门")
-            # 打印每种门的匹配结果
+        if door_matches and detect_log.isEnabledFor(logging.DEBUG):
+            # 每种门的匹配结果
             door_types = {}
             for door in door_matches:
-                door_type = door[2]  # 模板文件名
+                door_type = door[3]  # 模板文件名
                 if door_type not in door_types:
                     door_types[door_type] = 0
                 door_types[door_type] += 1
             
-            for door_type, count in door_types.items():
-                print(f"   - {door_type}: {count} 个")
+            detect_log.debug("🚪 找到 %d 个传送门 (%s)", len(door_matches),
+                             ", ".join(f"{door_type}: {count} 个" for door_type, count in door_types.items()))
         
         # 返回坐标列表（去除模板名称）
         return [(door[0], door[1]) for door in door_matches]
     
-    def detect_character(self, screen):
-        """检测角色位置 - 通过血条/蓝条定位"""
-        # 方法1: 检测角色血条 (通常在角色头顶或左上角UI)
-        character_pos = self.detect_character_by_hp_bar(screen)
+    def detect_character(self, frame, roi=None):
+        """检测角色位置 - 通过血条/蓝条定位
+        
+        roi: (x0, y0, x1, y1) 只在该窗口内检测，None 为整帧
+        """
+        frame = Frame.wrap(frame)
+        
+        # 方法1 + 方法2
+        character_pos = self.find_character(frame, roi)
         if character_pos:
             return character_pos
         
-        # 方法2: 检测特殊UI元素 (如技能冷却圈等)
-        ui_pos = self.detect_character_by_ui(screen)
-        if ui_pos:
-            return ui_pos
-        
         # 方法3: 回退到屏幕中心 (原始方法)
         center_x = self.game_region["width"] // 2
         center_y = self.game_region["height"] // 2
         return (center_x, center_y)
     
-    def detect_character_by_hp_bar(self, screen):
+    def find_character(self, frame, roi=None):
+        """依次尝试各种角色检测方法，都失败返回 None（不回退到屏幕中心）"""
+        # 方法1: 检测角色血条 (通常在角色头顶或左上角UI)
+        character_pos = self.detect_character_by_hp_bar(frame, roi)
+        if character_pos:
+            return character_pos
+        
+        # 方法2: 检测特殊UI元素 (如技能冷却圈等)
+        return self.detect_character_by_ui(frame, roi)
+    
+    def detect_character_by_hp_bar(self, frame, roi=None):
         """通过绿色文字检测角色位置（DNF特定方法）"""
         try:
-            hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
-            
-            # 检测绿色文字（角色名字或状态文字）
-            # DNF中角色附近通常有绿色的文字信息
-            lower_green_text = np.array([35, 40, 40])   # 绿色文字下限
-            upper_green_text = np.array([85, 255, 255]) # 绿色文字上限
-            
-            mask = cv2.inRange(hsv, lower_green_text, upper_green_text)
-            
-            # 形态学操作，连接文字区域
-            kernel = np.ones((3, 3), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-            
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # 寻找合适的绿色文字区域
-            best_candidate = None
-            best_score = 0
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if 50 < area < 1500:  # 文字区域面积范围
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    # 文字区域特征判断
-                    aspect_ratio = w / h if h > 0 else 0
-                    
-                    # 优先选择较长的文字区域（可能是角色名或状态）
-                    if 1.5 < aspect_ratio < 8 and w > 20:  # 文字应该是横向的
-                        # 角色位置：文字下方一定距离
-                        char_x = x + w // 2
-                        char_y = y + h + 40  # 文字下方40像素作为角色中心
-                        
-                        # 验证位置是否在游戏区域内
-                        if (100 < char_x < screen.shape[1] - 100 and 
-                            100 < char_y < screen.shape[0] - 100):
-                            
-                            # 计算得分（面积越大、位置越居中得分越高）
-                            center_x = screen.shape[1] // 2
-                            center_y = screen.shape[0] // 2
-                            distance_from_center = ((char_x - center_x)**2 + (char_y - center_y)**2)**0.5
-                            
-                            # 得分 = 面积权重 - 距离中心的惩罚
-                            score = area * 0.1 - distance_from_center * 0.01
-                            
-                            if score > best_score:
-                                best_score = score
-                                best_candidate = (char_x, char_y)
-            
+            # 绿色文字区域：横向、面积适中，角色在文字下方
+            best_candidate = self.locator.hypothesis(frame, "text", roi)
             if best_candidate:
-                print(f"✅ 通过绿色文字检测到角色位置: {best_candidate}")
+                detect_log.debug("✅ 通过绿色文字检测到角色位置: %s", best_candidate)
                 return best_candidate
             
             return None
             
         except Exception as e:
-            print(f"绿色文字检测错误: {e}")
+            detect_log.error("绿色文字检测错误: %s", e)
             return None
     
-    def detect_character_by_ui(self, screen):
+    def detect_character_by_ui(self, frame, roi=None):
         """通过DNF特有的UI元素检测角色位置"""
         try:
             # 方法1: 检测角色周围的绿色特效光圈
-            char_pos_1 = self.detect_character_by_green_aura(screen)
+            char_pos_1 = self.detect_character_by_green_aura(frame, roi)
             if char_pos_1:
                 return char_pos_1
             
             # 方法2: 检测角色移动时的绿色路径指示
-            char_pos_2 = self.detect_character_by_movement_indicator(screen)
+            char_pos_2 = self.detect_character_by_movement_indicator(frame, roi)
             if char_pos_2:
                 return char_pos_2
             
             # 方法3: 检测角色的绿色装备光效
-            char_pos_3 = self.detect_character_by_equipment_glow(screen)
+            char_pos_3 = self.detect_character_by_equipment_glow(frame, roi)
             if char_pos_3:
                 return char_pos_3
             
             return None
             
         except Exception as e:
-            print(f"UI检测错误: {e}")
+            detect_log.error("UI检测错误: %s", e)
             return None
     
-    def detect_character_by_green_aura(self, screen):
+    def detect_character_by_green_aura(self, frame, roi=None):
         """检测角色周围的绿色光圈/特效"""
         try:
-            hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
-            
-            # 检测明亮的绿色光效
-            lower_aura = np.array([40, 100, 100])
-            upper_aura = np.array([80, 255, 255])
-            
-            mask = cv2.inRange(hsv, lower_aura, upper_aura)
-            
-            # 寻找圆形或椭圆形的光效
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if 200 < area < 3000:  # 光圈面积范围
-                    # 检查形状是否接近圆形
-                    perimeter = cv2.arcLength(contour, True)
-                    if perimeter > 0:
-                        circularity = 4 * np.pi * area / (perimeter * perimeter)
-                        
-                        if circularity > 0.3:  # 接近圆形
-                            # 计算中心点
-                            M = cv2.moments(contour)
-                            if M["m00"] != 0:
-                                cx = int(M["m10"] / M["m00"])
-                                cy = int(M["m01"] / M["m00"])
-                                
-                                # 验证位置合理性
-                                if (150 < cx < screen.shape[1] - 150 and 
-                                    150 < cy < screen.shape[0] - 150):
-                                    print(f"✅ 通过绿色光圈检测到角色: ({cx}, {cy})")
-                                    return (cx, cy)
-            
-            return None
+            # 明亮、接近圆形的绿色连通域
+            pos = self.locator.hypothesis(frame, "aura", roi)
+            if pos:
+                detect_log.debug("✅ 通过绿色光圈检测到角色: %s", pos)
+            return pos
             
         except Exception as e:
-            print(f"光圈检测错误: {e}")
+            detect_log.error("光圈检测错误: %s", e)
             return None
     
-    def detect_character_by_movement_indicator(self, screen):
+    def detect_character_by_movement_indicator(self, frame, roi=None):
         """检测角色移动时的绿色路径指示器"""
         try:
-            hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
-            
-            # 检测移动路径的绿色指示
-            lower_path = np.array([35, 80, 80])
-            upper_path = np.array([85, 255, 255])
-            
-            mask = cv2.inRange(hsv, lower_path, upper_path)
-            
-            # 寻找线条状的绿色元素
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            path_points = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if 20 < area < 500:  # 路径点面积
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    # 路径点通常是小的圆形或正方形
-                    if 0.5 < w/h < 2.0 and max(w, h) < 30:
-                        center_x = x + w // 2
-                        center_y = y + h // 2
-                        path_points.append((center_x, center_y))
-            
-            # 如果有多个路径点，找到最密集的区域作为角色位置
-            if len(path_points) >= 2:
-                # 计算路径点的重心
-                avg_x = sum(p[0] for p in path_points) // len(path_points)
-                avg_y = sum(p[1] for p in path_points) // len(path_points)
-                
-                print(f"✅ 通过移动路径检测到角色: ({avg_x}, {avg_y})")
-                return (avg_x, avg_y)
-            
-            return None
+            # 多个小块绿色路径点的重心
+            pos = self.locator.hypothesis(frame, "path", roi)
+            if pos:
+                detect_log.debug("✅ 通过移动路径检测到角色: %s", pos)
+            return pos
             
         except Exception as e:
-            print(f"移动指示器检测错误: {e}")
+            detect_log.error("移动指示器检测错误: %s", e)
             return None
     
-    def detect_character_by_equipment_glow(self, screen):
+    def detect_character_by_equipment_glow(self, frame, roi=None):
         """检测角色装备的绿色光效"""
         try:
-            hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
-            
-            # 检测装备的绿色光效（通常比较明亮）
-            lower_glow = np.array([45, 120, 150])
-            upper_glow = np.array([75, 255, 255])
-            
-            mask = cv2.inRange(hsv, lower_glow, upper_glow)
-            
-            # 形态学操作，连接附近的光效
-            kernel = np.ones((5, 5), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if 100 < area < 2000:  # 装备光效面积
-                    # 计算重心
-                    M = cv2.moments(contour)
-                    if M["m00"] != 0:
-                        cx = int(M["m10"] / M["m00"])
-                        cy = int(M["m01"] / M["m00"])
-                        
-                        # 验证位置
-                        if (100 < cx < screen.shape[1] - 100 and 
-                            100 < cy < screen.shape[0] - 100):
-                            print(f"✅ 通过装备光效检测到角色: ({cx}, {cy})")
-                            return (cx, cy)
-            
-            return None
+            # 高饱和高亮度的绿色连通域
+            pos = self.locator.hypothesis(frame, "glow", roi)
+            if pos:
+                detect_log.debug("✅ 通过装备光效检测到角色: %s", pos)
+            return pos
             
         except Exception as e:
-            print(f"装备光效检测错误: {e}")
+            detect_log.error("装备光效检测错误: %s", e)
             return None
     
-    def get_character_position(self, screen):
-        """获取角色当前位置 (缓存优化)"""
-        if not hasattr(self, '_last_char_pos'):
-            self._last_char_pos = None
-            self._char_pos_frame_count = 0
+    def detect_changed(self, name, detector, frame, dirty):
+        """只在变化的图块上重新运行检测器，未开启变化检测时直接整帧检测"""
+        cache = self.tile_caches.get(name)
+        if cache is None:
+            return detector(frame)
+        return cache.run(frame, dirty, lambda f, region: detector(f, region) if cache.partial else detector(f))
+    
+    def track_monsters(self, frame, dirty=None):
+        """检测怪物并更新跟踪目标，返回已确认怪物的位置列表
+        
+        整帧发现之间只在已知目标附近的小窗口内确认
+        """
+        frame = Frame.wrap(frame)
+        discovery = self.monster_tracker.needs_discovery()
+        if discovery:
+            detections = self.detect_changed("monsters", self.detect_monsters, frame, dirty)
+        else:
+            detections = []
+            for region in self.monster_tracker.confirm_windows(frame.width, frame.height):
+                detections.extend(self.detect_monsters(frame, region))
+            if "monsters" in self.tile_caches:
+                self.tile_caches["monsters"].skip(dirty)
+        
+        self.monster_tracker.update(detections, frame.timestamp, discovery=discovery)
+        return self.monster_tracker.positions()
+    
+    def get_character_position(self, frame):
+        """获取角色当前位置 (跟踪预测 + 局部检测)"""
+        frame = Frame.wrap(frame)
+        now = frame.timestamp
         
-        # 每3帧更新一次角色位置 (性能优化)
-        self._char_pos_frame_count += 1
-        if self._char_pos_frame_count >= 3 or self._last_char_pos is None:
-            self._last_char_pos = self.detect_character(screen)
-            self._char_pos_frame_count = 0
+        # 同一帧只更新一次跟踪器
+        if getattr(self, '_tracked_frame', None) is not frame:
+            self._tracked_frame = frame
+            
+            if self.tracker.needs_full_search():
+                # 尚未定位或连续漏检：整帧检测
+                roi = None
+            else:
+                # 只在预测位置附近 search_radius 范围内检测
+                roi = self.tracker.search_window(frame.width, frame.height, now)
+            pos = self.find_character(frame, roi)
+            self.tracker.record_search(roi is not None, pos is not None)
+            
+            if pos:
+                self.tracker.update(pos, now)
+            else:
+                self.tracker.miss(now)
         
-        return self._last_char_pos
+        char_pos = self.tracker.current()
+        if char_pos is None:
+            # 从未定位成功时回退到屏幕中心
+            char_pos = (self.game_region["width"] // 2, self.game_region["height"] // 2)
+        return char_pos
     
-    def move_to_position(self, target_x, target_y, screen):
-        """移动角色到指定位置"""
+    def move_to_position(self, target_x, target_y, frame):
+        """移动角色到指定位置（提交移动意图后立即返回）"""
         # 获取角色当前位置
-        char_pos = self.get_character_position(screen)
+        char_pos = self.get_character_position(frame)
         char_x, char_y = char_pos
         
-        # 计算需要移动的方向
-        diff_x = target_x - char_x
-        diff_y = target_y - char_y
+        # 用上一次移动后的真实检测位移修正速度估计
+        self.movement.observe(self.tracker.last_measurement)
         
-        # 计算距离
-        distance = (diff_x**2 + diff_y**2)**0.5
+        # 计算方向和按住时间
+        plan = self.movement.plan(char_pos, (target_x, target_y))
         
-        # 如果距离太近，不需要移动
-        if distance < self.config.THRESHOLDS["movement_threshold"]:
+        # 如果距离太近，不需要移动（停止正在进行的移动）
+        if plan is None:
+            self.stop_movement(frame, arrived=True)
             return True
         
-        print(f"🚶 角色移动: ({char_x}, {char_y}) -> ({target_x}, {target_y}), 距离: {distance:.1f}")
+        direction, duration = plan
+        distance = ((target_x - char_x)**2 + (target_y - char_y)**2)**0.5
+        action_log.info("🚶 角色移动: (%d, %d) -> (%d, %d), 距离: %.1f, 按住 %.2fs",
+                        char_x, char_y, target_x, target_y, distance, duration)
         
-        # 根据方向移动 (优先移动距离更大的轴)
-        if abs(diff_x) > abs(diff_y):
-            if diff_x > 0:
-                pyautogui.keyDown('right')
-                time.sleep(self.config.DELAYS["movement"])
-                pyautogui.keyUp('right')
-            else:
-                pyautogui.keyDown('left')
-                time.sleep(self.config.DELAYS["movement"])
-                pyautogui.keyUp('left')
-        else:
-            if diff_y > 0:
-                pyautogui.keyDown('down')
-                time.sleep(self.config.DELAYS["movement"])
-                pyautogui.keyUp('down')
-            else:
-                pyautogui.keyDown('up')
-                time.sleep(self.config.DELAYS["movement"])
-                pyautogui.keyUp('up')
+        # 两个轴都要走时同时按住两个方向键斜向移动
+        keys = []
+        if direction[0]:
+            keys.append(self.config.KEYS["right"] if direction[0] > 0 else self.config.KEYS["left"])
+        if direction[1]:
+            keys.append(self.config.KEYS["down"] if direction[1] > 0 else self.config.KEYS["up"])
+        
+        # 同方向则延长按住时间，换方向时只松开不再需要的方向键
+        now = time.time()
+        self.action_timer.cancel()
+        self.input.hold(keys, duration, tag="move")
+        self.movement.command_started(direction, duration, self.tracker.last_measurement, now)
+        # 告诉跟踪器我们的移动指令，用于预测下一帧位置（跟踪器统一使用截图时间戳）
+        vx, vy = self.movement.velocity(direction)
+        self.tracker.notify_velocity(vx, vy, duration, Frame.wrap(frame).timestamp)
         
         return False
     
-    def attack_monsters(self, monsters, screen):
+    def stop_movement(self, frame, arrived=False):
+        """停止正在进行的移动（frame 为做出该决定所依据的截图）"""
+        self.movement.stop(time.time(), arrived=arrived)
+        self.input.cancel("move")
+        self.tracker.stop_command(Frame.wrap(frame).timestamp)
+    
+    def attack_monsters(self, monsters, frame):
         """攻击怪物"""
         if monsters:
+            # 上一次攻击动作还没结束
+            if self.input.is_busy("attack"):
+                return
+            
             # 获取角色位置
-            char_pos = self.get_character_position(screen)
-            char_x, char_y = char_pos
+            char_pos = self.get_character_position(frame)
             
-            # 找最近的怪物
-            closest_monster = min(monsters, 
-                key=lambda m: ((m[0] - char_x)**2 + (m[1] - char_y)**2)**0.5)
+            # 锁定的目标还在就继续攻击它，否则选最近的怪物
+            target = self.monster_tracker.select_target(char_pos)
+            if target is None:
+                return
+            closest_monster = target.position
             
             # 计算距离
-            distance = ((closest_monster[0] - char_x)**2 + (closest_monster[1] - char_y)**2)**0.5
+            distance = spatial.distance(closest_monster, char_pos)
             
             # 如果距离较远，先移动过去
             if distance > 100:  # 100像素以外才移动
-                moved = self.move_to_position(closest_monster[0], closest_monster[1], screen)
+                moved = self.move_to_position(closest_monster[0], closest_monster[1], frame)
                 if not moved:  # 还在移动中
                     return
             
-            # 攻击
-            print(f"⚔️ 攻击怪物，距离: {distance:.1f}")
-            pyautogui.press(self.config.KEYS["attack"])
-            time.sleep(self.config.DELAYS["attack"])
-    
-    def collect_items(self, items, screen):
-        """收集物品"""
-        for item in items:
-            # 移动到物品位置
-            moved = self.move_to_position(item[0], item[1], screen)
-            if moved:  # 已经到达物品位置
-                # 拾取
-                print(f"💰 拾取物品")
-                pyautogui.press(self.config.KEYS["pickup"])
-                time.sleep(self.config.DELAYS["pickup"])
-    
-    def go_to_next_room(self, doors, screen):
+            # 攻击（停下后出招，攻击动作期间不再重复提交）
+            action_log.info("⚔️ 攻击怪物 #%d，距离: %.1f", target.id, distance)
+            self.stop_movement(frame)
+            self.input.press(self.config.KEYS["attack"], tag="attack",
+                             busy_for=self.profile["attack"])
+            self.action_timer.begin("attack", char_pos, time.time())
+    
+    def collect_items(self, items, frame):
+        """收集物品（每帧只朝当前目标提交一次意图）"""
+        if not items or self.input.is_busy("pickup"):
+            return
+        
+        # 按规划好的路线拾取（最近邻 + 2-opt，已拾取的点删除，新物品插入路线）
+        char_pos = self.get_character_position(frame)
+        self.pickup_planner.update(char_pos, items)
+        item = self.pickup_planner.next_stop()
+        
+        # 移动到物品位置
+        moved = self.move_to_position(item[0], item[1], frame)
+        if moved:  # 已经到达物品位置
+            # 拾取
+            action_log.info("💰 拾取物品，路线剩余 %d 个", len(self.pickup_planner.route) - 1)
+            self.pickup_planner.reached()
+            self.input.press(self.config.KEYS["pickup"], tag="pickup",
+                             busy_for=self.profile["pickup"])
+            self.action_timer.begin("pickup", char_pos, time.time())
+    
+    def go_to_next_room(self, doors, frame):
         """前往下一个房间"""
         if doors:
-            # 选择第一个门
-            door = doors[0]
+            # 选择最近的门
+            index, _ = spatial.nearest(self.get_character_position(frame), doors)
+            door = doors[index]
             
             # 移动到门的位置
-            moved = self.move_to_position(door[0], door[1], screen)
+            moved = self.move_to_position(door[0], door[1], frame)
             if moved:  # 已经到达门的位置
-                # 进门
-                print(f"🚪 进入传送门")
-                pyautogui.press(self.config.KEYS["enter_door"])
-                time.sleep(self.config.DELAYS["door_enter"])
+                # 进门（过图期间主循环只观察画面变化，不阻塞线程）
+                action_log.info("🚪 进入传送门")
+                self.action_timer.cancel()
+                self.input.press(self.config.KEYS["enter_door"], tag="door",
+                                 busy_for=self.profile["door_enter"])
+                # 过图最长等待实测过图时间的2倍
+                self.transition.begin(frame, time.time(), max_duration=self.profile["door_enter"] * 2)
+    
+    def wait_room_transition(self, frame):
+        """过图期间处理一帧，返回是否仍在过图"""
+        state = self.transition.observe(frame)
+        if state == RoomTransitionDetector.DONE:
+            action_log.info("🚪 已进入新房间，用时 %.2fs", self.transition.last_duration)
+            self.input.cancel("door")
+            self.profile.adapt("door_enter", self.transition.last_duration)
+            self.on_room_entered()
+            return False
+        if state == RoomTransitionDetector.TIMED_OUT:
+            # 超时的耗时不是真实的过图时间，不用于修正 door_enter
+            action_log.warning("⚠️  过图超时（%.1fs 内画面没有稳定），按已进入新房间处理",
+                               self.transition.max_duration)
+            self.input.cancel("door")
+            self.on_room_entered()
+            return False
+        if state == RoomTransitionDetector.FAILED:
+            # 画面没有变化：没有进门，马上重新检测并重试
+            action_log.warning("⚠️  进门失败，重新尝试")
+            self.input.cancel("door")
+            return False
+        return True
+    
+    def on_room_entered(self):
+        """进入新房间：上一个房间的跟踪状态全部作废"""
+        self.monster_tracker.clear()
+        self.pickup_planner.clear()
+        self.tracker.reset()
+        self.search_regions.reset()
+        self.state.reset_room()
+        if self.changes is not None:
+            self.changes.reset()
     
     def save_debug_screenshot(self, screen, char_pos, monsters, items, doors):
-        """保存调试截图，标注识别结果"""
-        debug_screen = screen.copy()
+        """保存调试截图，标注识别结果（只复制画面，标注和写盘在后台线程完成）"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        monsters, items, doors = list(monsters), list(items), list(doors)
+        self.debug_writer.submit(
+            screen, lambda image: self.draw_debug_overlay(image, timestamp, char_pos, monsters, items, doors))
         
+        if char_pos:
+            log.info("🎯 当前识别的角色位置: %s", char_pos)
+        else:
+            log.info("❌ 未识别到角色位置")
+        log.info("👹 怪物数: %d, 💰 物品数: %d, 🚪 门数: %d", len(monsters), len(items), len(doors))
+    
+    def draw_debug_overlay(self, debug_screen, timestamp, char_pos, monsters, items, doors):
+        """在调试截图上绘制识别结果（在调试截图写入线程中调用）"""
         # 绘制角色位置（红色大圆）
         if char_pos:
             cv2.circle(debug_screen, char_pos, 25, (0, 0, 255), 4)
@@ -685,7 +859,6 @@ class DNFBot:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
         
         # 添加时间戳和统计信息
-        timestamp = datetime.now().strftime("%H:%M:%S")
         cv2.putText(debug_screen, f"Time: {timestamp}", (10, 30), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         
@@ -704,34 +877,74 @@ class DNFBot:
         
         cv2.putText(debug_screen, f"Doors: {len(doors)}", (10, 150), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    
+    def run_detectors(self, frame, dirty):
+        """运行当前状态需要的检测器，返回合并了上次结果的完整检测结果"""
+        detectors = {
+            "character": self.get_character_position,
+            "monsters": lambda f: self.track_monsters(f, dirty),
+            "items": lambda f: self.detect_changed("items", self.detect_items, f, dirty),
+            "materials": lambda f: self.detect_changed("materials", self.detect_materials, f, dirty),
+            "doors": lambda f: self.detect_changed("doors", self.detect_doors, f, dirty)
+        }
+        due = self.scheduler.select(self.state.state, self.state.entered_at)
         
-        # 保存截图
-        filename = f"debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        filepath = os.path.join(self.debug_folder, filename)
-        cv2.imwrite(filepath, debug_screen)
+        # 本帧不运行的检测器：记下变化过的图块，下次运行时一并重新检测
+        for name, cache in self.tile_caches.items():
+            if name not in due:
+                cache.skip(dirty)
         
-        print(f"📸 调试截图已保存: {filename}")
-        if char_pos:
-            print(f"🎯 当前识别的角色位置: {char_pos}")
-        else:
-            print("❌ 未识别到角色位置")
-        print(f"👹 怪物数: {len(monsters)}, 💰 物品数: {len(items)}, 🚪 门数: {len(doors)}")
-        print("-" * 60)
+        lost = self.monster_tracker.lost
+        results, timings = self.detectors.run(frame, {name: detectors[name] for name in due})
+        self.scheduler.record(timings)
+        
+        # 有怪物消失（通常是被击杀）：下一帧检测掉落物
+        if self.monster_tracker.lost > lost:
+            self.scheduler.trigger("items", "materials")
+        
+        return self.state.record(results)
+    
+    def save_profile(self):
+        """把运行中修正过的移动速度写回角色档案（校准得到的基准值不变）"""
+        self.profile.set_adapted("speed_x", self.movement.speed_x)
+        self.profile.set_adapted("speed_y", self.movement.speed_y)
+        try:
+            self.profile.save()
+            log.info("👤 角色档案已保存: %s", self.profile.summary())
+        except OSError as e:
+            log.warning("⚠️  角色档案保存失败: %s", e)
+    
+    def calibrate(self, include_door=True):
+        """校准模式：实测移动速度、动作时长和过图时间并保存到角色档案"""
+        Calibrator(self, self.profile).run(include_door=include_door)
     
     def main_loop(self):
         """主循环"""
-        print("DNF自动刷图开始运行...")
-        print("按 F1 开始/暂停，按 F2 停止")
-        print(f"📸 调试截图将每10秒保存到: {self.debug_folder}")
+        state_log.info("DNF自动刷图开始运行...")
+        state_log.info("按 F1 开始/暂停，按 F2 停止")
+        log.info("📸 调试截图将每10秒保存到: %s", self.debug_folder)
+        
+        self.start_capture_thread()
+        self.input.start()
         
         while True:
             if keyboard.is_pressed('f1'):
                 self.running = not self.running
-                print(f"{'开始' if self.running else '暂停'}运行")
+                state_log.info("%s运行", '开始' if self.running else '暂停')
+                if not self.running:
+                    # 暂停时松开所有按键
+                    self.input.cancel_all()
                 time.sleep(0.5)
             
             if keyboard.is_pressed('f2'):
-                print("停止运行")
+                state_log.info("停止运行")
+                self.save_profile()
+                self.input.stop()
+                self.stop_capture_thread()
+                self.detectors.shutdown()
+                self.debug_writer.stop()
+                report_log.info(self.debug_writer.report())
+                shutdown_logging()
                 break
             
             if not self.running:
@@ -739,50 +952,114 @@ class DNFBot:
                 continue
             
             try:
-                # 截取屏幕
-                screen = self.capture_screen()
+                # 模板文件有变化时热重载（节流，不在检测函数中访问磁盘）
+                self.templates.poll()
                 
-                # 获取角色位置（用于调试）
-                char_pos = self.get_character_position(screen)
-                
-                # 检测怪物
-                monsters = self.detect_monsters(screen)
-                if monsters:
-                    print(f"👹 发现 {len(monsters)} 个怪物，开始攻击...")
-                    self.attack_monsters(monsters, screen)
+                # 获取最新一帧（帧对象缓存HSV/灰度，所有检测共享）
+                with metrics.timer("capture"):
+                    frame = self.capture_frame()
+                if frame is None:
                     continue
+                tick_start = time.perf_counter()
                 
-                # 检测物品
-                items = self.detect_items(screen)
-                if items:
-                    print(f"💰 发现 {len(items)} 个金币，开始拾取...")
-                    self.collect_items(items, screen)
+                # 正在进门：只观察画面变化，新房间显示后立即恢复检测
+                if self.transition.active:
+                    if not self.wait_room_transition(frame):
+                        if self.transition.state == RoomTransitionDetector.DONE:
+                            self.state.change(dungeon_state.ROOM_CLEAR, "进入新房间")
+                        elif self.transition.state == RoomTransitionDetector.TIMED_OUT:
+                            self.state.change(dungeon_state.ROOM_CLEAR, "过图超时")
+                        else:
+                            self.state.change(dungeon_state.NAVIGATE, "进门失败，重试")
                     continue
                 
-                # 检测门
-                doors = self.detect_doors(screen)
-                if doors:
-                    print(f"🚪 发现 {len(doors)} 个传送门，前往下一房间...")
-                    self.go_to_next_room(doors, screen)
+                # 定期输出截图耗时
+                if time.time() - self.last_capture_report_time >= self.debug_interval:
+                    if self.capture_thread is not None:
+                        report_log.info(self.capture_thread.report())
+                    else:
+                        report_log.info(self.capture.report())
+                    report_log.info(self.detectors.report())
+                    report_log.info(self.tracker.report())
+                    report_log.info(self.movement.report())
+                    report_log.info(self.action_timer.report(self.profile))
+                    report_log.info(self.transition.report())
+                    report_log.info(self.state.report())
+                    report_log.info(self.scheduler.report())
+                    report_log.info(self.debug_writer.report())
+                    if self.changes is not None:
+                        caches = ", ".join(c.report(n) for n, c in self.tile_caches.items())
+                        report_log.info("%s (%s)", self.changes.report(), caches)
+                    if metrics.enabled:
+                        report_log.info(metrics.summary())
+                        metrics.export()
+                    if dropped_count():
+                        report_log.warning("⚠️  日志队列已满，累计丢弃 %d 条日志", dropped_count())
+                    self.last_capture_report_time = time.time()
+                
+                # 与上一帧比较，找出有变化的图块
+                with metrics.timer("tick.detect"):
+                    dirty = self.changes.update(frame) if self.changes is not None else None
+                    
+                    # 攻击/拾取动作结束（角色周围画面稳定）时修正档案中的动作时长
+                    finished = self.action_timer.observe(dirty, frame.timestamp)
+                    if finished is not None:
+                        self.profile.adapt(*finished)
+                    
+                    # 当前状态需要的检测器在同一帧上并行运行（干净图块沿用上次结果）
+                    results = self.run_detectors(frame, dirty)
+                char_pos = results["character"]
+                monsters = results["monsters"]
+                # 金币和材料合并成一组拾取点
+                items = results["items"] + results["materials"]
+                doors = results["doors"]
+                
+                # 根据检测结果切换状态（优先级：怪物 > 物品 > 门），再执行该状态的动作
+                state = self.state.decide(results)
+                
+                if state in (dungeon_state.COMBAT, dungeon_state.LOOT, dungeon_state.NAVIGATE):
+                    with metrics.timer("tick.act"):
+                        if state == dungeon_state.COMBAT:
+                            self.attack_monsters(monsters, frame)
+                        elif state == dungeon_state.LOOT:
+                            self.collect_items(items, frame)
+                        else:
+                            self.go_to_next_room(doors, frame)
+                            if self.transition.active:
+                                self.state.change(dungeon_state.TRANSITION, "按下进门键")
+                    metrics.record("tick", (time.perf_counter() - tick_start) * 1000)
                     continue
                 
                 # 定期保存调试截图（每10秒）
                 current_time = time.time()
                 if current_time - self.last_debug_time >= self.debug_interval:
-                    self.save_debug_screenshot(screen, char_pos, monsters, items, doors)
+                    self.save_debug_screenshot(frame.image, char_pos or (0, 0), monsters, items, doors)
                     self.last_debug_time = current_time
                 
-                # 如果没有怪物、物品和门，检查是否需要重新开始
-                # 这里可以添加"再来一次"的检测逻辑
+                # 地下城结束：这里可以添加"再来一次"的检测逻辑
+                metrics.record("tick", (time.perf_counter() - tick_start) * 1000)
                 
-                time.sleep(0.1)
+                # 后台截图时等待新帧本身就是节拍，不再固定等待
+                if self.capture_thread is None:
+                    time.sleep(self.profile["main_loop"])
                 
             except Exception as e:
-                print(f"❌ 运行错误: {e}")
-                import traceback
-                traceback.print_exc()
+                log.exception("❌ 运行错误: %s", e)
                 time.sleep(1)
 
 if __name__ == "__main__":
-    bot = DNFBot()
-    bot.main_loop()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="DNF自动刷图")
+    parser.add_argument("--profile", help="角色档案名（默认使用配置中的档案）")
+    parser.add_argument("--calibrate", action="store_true", help="校准模式：实测移动速度和动作时长")
+    parser.add_argument("--no-door", action="store_true", help="校准时跳过过图时间测量")
+    parser.add_argument("--verbosity", choices=["quiet", "normal", "debug"],
+                        help="日志详细程度：quiet 只输出状态切换和错误，debug 输出每帧检测结果（默认使用配置）")
+    args = parser.parse_args()
+    
+    bot = DNFBot(profile_name=args.profile, verbosity=args.verbosity)
+    if args.calibrate:
+        bot.calibrate(include_door=not args.no_door)
+    else:
+        bot.main_loop()
@@ -16,6 +16,7 @@ import os
 import sys
 import config
 from datetime import datetime
+from debug_writer import DebugScreenshotWriter
 
 class DNFBotDebug:
     def __init__(self):
@@ -70,6 +71,20 @@ class DNFBotDebug:
         
         self.last_debug_time = 0
         self.debug_interval = 10  # 10秒间隔
+        
+        # 调试截图后台写入（标注和编码不阻塞检测循环）
+        options = self.config.DEBUG_SCREENSHOTS
+        self.debug_writer = DebugScreenshotWriter(
+            self.debug_folder,
+            image_format=options["format"],
+            jpeg_quality=options["jpeg_quality"],
+            png_compression=options["png_compression"],
+            thumbnail_width=options["thumbnail_width"],
+            queue_size=options["queue_size"],
+            max_files=options["max_files"],
+            max_total_mb=options["max_total_mb"]
+        )
+        self.debug_writer.start()
     
     def capture_screen(self):
         """截取游戏屏幕"""
@@ -163,9 +178,24 @@ class DNFBotDebug:
         return monsters
     
     def save_debug_screenshot(self, screen, char_result, monsters):
-        """保存调试截图，标注识别结果"""
-        debug_screen = screen.copy()
+        """保存调试截图，标注识别结果（标注和写盘在后台线程完成）"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        filename = self.debug_writer.submit(
+            screen, lambda image: self.draw_debug_overlay(image, timestamp, char_result, monsters))
+        
+        print(f"📸 调试截图已提交: {filename}")
+        
+        # 详细日志
+        if char_result and char_result[0]:
+            best = char_result[0]
+            print(f"🎯 最佳角色候选: 位置{best['char_pos']}, 面积{best['area']:.0f}, 得分{best['score']:.2f}")
         
+        print(f"👹 检测到 {len(monsters)} 个怪物")
+        print(f"📝 总候选数: {len(char_result[1]) if char_result else 0}")
+        print("-" * 50)
+    
+    def draw_debug_overlay(self, debug_screen, timestamp, char_result, monsters):
+        """在调试截图上绘制检测结果（在调试截图写入线程中调用）"""
         # 绘制角色检测结果
         if char_result:
             best_candidate, all_candidates = char_result
@@ -210,7 +240,6 @@ class DNFBotDebug:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
         
         # 添加时间戳和统计信息
-        timestamp = datetime.now().strftime("%H:%M:%S")
         cv2.putText(debug_screen, f"Time: {timestamp}", (10, 30), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         
@@ -224,22 +253,6 @@ class DNFBotDebug:
         
         cv2.putText(debug_screen, f"Candidates: {len(char_result[1]) if char_result else 0}", (10, 120), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        # 保存截图
-        filename = f"debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        filepath = os.path.join(self.debug_folder, filename)
-        cv2.imwrite(filepath, debug_screen)
-        
-        print(f"📸 调试截图已保存: {filename}")
-        
-        # 详细日志
-        if char_result and char_result[0]:
-            best = char_result[0]
-            print(f"🎯 最佳角色候选: 位置{best['char_pos']}, 面积{best['area']:.0f}, 得分{best['score']:.2f}")
-        
-        print(f"👹 检测到 {len(monsters)} 个怪物")
-        print(f"📝 总候选数: {len(char_result[1]) if char_result else 0}")
-        print("-" * 50)
     
     def main_loop(self):
         """主循环 - 调试版本"""
@@ -255,6 +268,8 @@ class DNFBotDebug:
             
             if keyboard.is_pressed('f2'):
                 print("🔴 停止运行")
+                self.debug_writer.stop()
+                print(self.debug_writer.report())
                 break
             
             if not self.running:
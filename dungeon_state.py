@@ -0,0 +1,105 @@
+"""
+DNF Bot 刷图状态机
+显式的刷图状态（战斗、拾取、寻路、过图、房间清空、地下城结束）代替主循环里按优先级的 if/continue，
+每个状态只运行自己需要的检测器（由 DetectorScheduler 按状态调度）；状态切换和每个状态的停留时间都会记录下来
+"""
+
+import time
+from collections import deque
+from bot_logging import get_logger
+
+log = get_logger("state")
+
+COMBAT = "combat"            # 有怪物：攻击
+LOOT = "loot"                # 没有怪物、有掉落物：拾取
+NAVIGATE = "navigate"        # 房间已清空、找到传送门：前往下一房间
+TRANSITION = "transition"    # 正在过图
+ROOM_CLEAR = "room_clear"    # 刚进房间或状态不明：所有检测器都跑一遍再决定
+DUNGEON_END = "dungeon_end"  # 长时间没有怪物、物品和传送门：地下城结束
+
+STATES = (COMBAT, LOOT, NAVIGATE, TRANSITION, ROOM_CLEAR, DUNGEON_END)
+
+# 决定各状态去留的检测器：结果未知时保持当前状态，调度时不受预算限制
+DECIDING_DETECTORS = {COMBAT: "monsters", LOOT: "items", NAVIGATE: "doors"}
+
+
+class DungeonStateMachine:
+    """刷图状态"""
+
+    def __init__(self, end_timeout=15.0, history_size=50):
+        # 房间清空后这么久还没有发现传送门或新目标，视为地下城结束（秒）
+        self.end_timeout = end_timeout
+
+        self.state = ROOM_CLEAR
+        self.entered_at = time.time()
+        # 各检测器最近一次的结果；本帧没有运行的检测器沿用上次结果
+        self.results = {}
+        # 本状态内已经运行过的检测器（没运行过的结果视为未知）
+        self.evaluated = set()
+
+        # 统计：状态切换记录、各状态累计停留时间和进入次数
+        self.history = deque(maxlen=history_size)
+        self.time_in_state = {state: 0.0 for state in STATES}
+        self.visits = {state: 0 for state in STATES}
+        self.visits[self.state] += 1
+
+    def record(self, results):
+        """记录本帧运行的检测器结果，返回合并了缓存结果的完整结果"""
+        self.results.update(results)
+        self.evaluated.update(results)
+        merged = {"character": None, "monsters": [], "items": [], "materials": [], "doors": []}
+        merged.update(self.results)
+        return merged
+
+    def decide(self, results, now=None):
+        """根据检测结果决定下一个状态（优先级：怪物 > 物品 > 传送门）"""
+        now = now if now is not None else time.time()
+        items = results["items"] + results["materials"]
+        if results["monsters"]:
+            return self.change(COMBAT, f"{len(results['monsters'])} 个怪物", now)
+        if items and {"items", "materials"} & self.evaluated:
+            return self.change(LOOT, f"{len(items)} 个物品", now)
+        if results["doors"] and "doors" in self.evaluated:
+            return self.change(NAVIGATE, f"{len(results['doors'])} 个传送门", now)
+
+        deciding = DECIDING_DETECTORS.get(self.state)
+        if deciding is not None and deciding not in self.evaluated:
+            # 决定当前状态的检测器本状态内还没运行过，结果未知，先保持
+            return self.state
+        if self.state not in (ROOM_CLEAR, DUNGEON_END):
+            # 当前状态没有运行全部检测器，先全面检查一遍再决定
+            return self.change(ROOM_CLEAR, "没有当前目标", now)
+        if self.state == ROOM_CLEAR and now - self.entered_at >= self.end_timeout:
+            return self.change(DUNGEON_END, f"{self.end_timeout:.0f}s 内没有发现目标", now)
+        return self.state
+
+    def change(self, state, reason="", now=None):
+        """切换状态并记录上一个状态的停留时间"""
+        if state == self.state:
+            return state
+        now = now if now is not None else time.time()
+        duration = now - self.entered_at
+        self.time_in_state[self.state] += duration
+        self.history.append((self.state, state, duration, reason))
+        log.info("🔁 状态 %s -> %s（停留 %.2fs%s）", self.state, state, duration, "，" + reason if reason else "")
+
+        self.state = state
+        self.entered_at = now
+        self.evaluated = set()
+        self.visits[state] += 1
+        return state
+
+    def reset_room(self):
+        """进入新房间：上一个房间的检测结果作废"""
+        self.results = {}
+        self.evaluated = set()
+
+    def report(self):
+        """格式化的各状态累计停留时间"""
+        now = time.time()
+        parts = []
+        for state in STATES:
+            total = self.time_in_state[state] + (now - self.entered_at if state == self.state else 0.0)
+            if self.visits[state]:
+                parts.append(f"{state} {total:.1f}s/{self.visits[state]}次")
+        return f"🔁 状态: 当前 {self.state} ({', '.join(parts)})"
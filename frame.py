@@ -0,0 +1,110 @@
+"""
+DNF Bot 帧对象
+包装一帧截图，按需计算并缓存 HSV、灰度和金字塔缩放图，
+保证每种颜色转换在一帧内最多执行一次（多个检测线程共享同一帧时也是如此）
+"""
+
+import threading
+import time
+import cv2
+from instrumentation import metrics
+
+
+class Frame:
+    """一帧截图及其预处理结果的缓存"""
+
+    def __init__(self, image, timestamp=None, seq=0):
+        self.image = image
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.seq = seq
+
+        self._hsv = None
+        self._gray = None
+        # 金字塔第0层即原图
+        self._pyramid = [image]
+        self._gray_pyramid = []
+        # 其他模块基于本帧计算的中间结果（如绿色连通域表）
+        self._memo = {}
+        # 多个检测线程并发访问时保证每种转换只算一次：每个缓存项一把锁，
+        # 计算某一项时不阻塞其他项（如构建轮廓表时其他检测器仍可取金字塔图）
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    @classmethod
+    def wrap(cls, screen):
+        """兼容旧接口：传入的是 numpy 图像时包装成 Frame"""
+        if isinstance(screen, cls):
+            return screen
+        return cls(screen)
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    @property
+    def width(self):
+        return self.image.shape[1]
+
+    @property
+    def height(self):
+        return self.image.shape[0]
+
+    @property
+    def hsv(self):
+        """HSV 图（首次访问时计算）"""
+        if self._hsv is None:
+            with self._lock_for("hsv"):
+                if self._hsv is None:
+                    with metrics.timer("cv2.hsv"):
+                        self._hsv = cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)
+        return self._hsv
+
+    @property
+    def gray(self):
+        """灰度图（首次访问时计算）"""
+        if self._gray is None:
+            with self._lock_for("gray"):
+                if self._gray is None:
+                    with metrics.timer("cv2.gray"):
+                        self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def pyramid(self, level):
+        """彩色金字塔第 level 层（每层宽高减半）"""
+        if len(self._pyramid) <= level:
+            with self._lock_for("pyramid"):
+                while len(self._pyramid) <= level:
+                    self._pyramid.append(self._half(self._pyramid[-1]))
+        return self._pyramid[level]
+
+    def gray_pyramid(self, level):
+        """灰度金字塔第 level 层（每层宽高减半）"""
+        if len(self._gray_pyramid) <= level:
+            with self._lock_for("gray_pyramid"):
+                if not self._gray_pyramid:
+                    self._gray_pyramid.append(self.gray)
+                while len(self._gray_pyramid) <= level:
+                    self._gray_pyramid.append(self._half(self._gray_pyramid[-1]))
+        return self._gray_pyramid[level]
+
+    def memo(self, key, compute):
+        """按 key 缓存基于本帧的计算结果，compute 在一帧内只执行一次"""
+        if key not in self._memo:
+            with self._lock_for(("memo", key)):
+                if key not in self._memo:
+                    self._memo[key] = compute()
+        return self._memo[key]
+
+    def _lock_for(self, key):
+        """缓存项 key 的锁（可重入，compute 中可以访问本帧的其他缓存项）"""
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.RLock()
+            return lock
+
+    @staticmethod
+    @metrics.timed("cv2.pyramid")
+    def _half(image):
+        h, w = image.shape[:2]
+        return cv2.resize(image, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
@@ -0,0 +1,205 @@
+"""
+DNF Bot 输入调度器
+按时间排队的按下/松开事件在独立线程执行，动作函数提交意图后立即返回，
+检测与动作可以并行，新目标可以取消正在进行的移动
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from instrumentation import metrics
+from bot_logging import get_logger
+
+log = get_logger("input")
+
+
+class InputIntent:
+    """一次输入意图（一组按键按住一段时间）"""
+
+    def __init__(self, intent_id, tag, keys, end_time):
+        self.id = intent_id
+        self.tag = tag
+        self.keys = tuple(keys)
+        self.end_time = end_time
+        self.pressed = set()
+        self.cancelled = False
+
+
+class InputScheduler(threading.Thread):
+    """非阻塞输入调度线程"""
+
+    def __init__(self, key_down, key_up):
+        super().__init__(name="InputScheduler", daemon=True)
+        self.key_down = key_down
+        self.key_up = key_up
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+
+        # 事件堆: (执行时间, 顺序号, 动作, 意图id, 按键)
+        self._events = []
+        self._order = itertools.count()
+        self._intent_ids = itertools.count(1)
+
+        # 尚未结束的意图 {id: intent}，每个标签当前的意图，以及标签忙碌截止时间
+        self._live = {}
+        self._by_tag = {}
+        self._busy_until = {}
+
+    # ---------- 提交意图 ----------
+
+    def hold(self, keys, duration, tag="move"):
+        """按住一组按键 duration 秒
+
+        同一标签的新意图会取消旧意图；按键相同则只延长松开时间，避免按键抖动；
+        按键组合变化时（如 [上] -> [上, 左]）两组共有的键保持按住，只松开不再需要的键
+        （DNF 中方向键连按两次是冲刺）
+        """
+        if isinstance(keys, str):
+            keys = [keys]
+        now = time.time()
+        with self._lock:
+            current = self._by_tag.get(tag)
+            if current is not None and set(current.keys) == set(keys):
+                # 同方向继续移动：推迟松开时间
+                current.end_time = now + duration
+                self._schedule(current.end_time, "end", current.id)
+                self._busy_until[tag] = current.end_time
+                self._wakeup.notify()
+                return current
+
+            intent = self._new_intent(tag, keys, now + duration)
+            if current is not None:
+                # 共有且已按下的键转交给新意图，旧意图结束时不会松开它们
+                shared = current.pressed & set(intent.keys)
+                current.pressed -= shared
+                intent.pressed |= shared
+                self._cancel_locked(current)
+
+            for key in intent.keys:
+                if key not in intent.pressed:
+                    self._schedule(now, "down", intent.id, key)
+            self._schedule(intent.end_time, "end", intent.id)
+            self._busy_until[tag] = intent.end_time
+            self._wakeup.notify()
+            return intent
+
+    def press(self, key, tag=None, busy_for=0):
+        """点按一个键，并把标签标记为忙碌 busy_for 秒（代替动作后的 sleep）"""
+        now = time.time()
+        with self._lock:
+            intent = self._new_intent(None, [key], now)
+            self._schedule(now, "down", intent.id, key)
+            self._schedule(now, "end", intent.id)
+            if tag is not None:
+                self._busy_until[tag] = now + busy_for
+            self._wakeup.notify()
+            return intent
+
+    def cancel(self, tag):
+        """取消某个标签的意图，已按下的键立即松开"""
+        with self._lock:
+            intent = self._by_tag.get(tag)
+            if intent is not None:
+                self._cancel_locked(intent)
+            self._busy_until.pop(tag, None)
+            self._wakeup.notify()
+
+    def cancel_all(self):
+        """取消所有意图并松开所有按键"""
+        with self._lock:
+            for intent in list(self._live.values()):
+                self._cancel_locked(intent)
+            self._busy_until.clear()
+            self._wakeup.notify()
+
+    def is_busy(self, tag):
+        """标签对应的动作是否仍在进行中"""
+        with self._lock:
+            return time.time() < self._busy_until.get(tag, 0)
+
+    def stop(self, timeout=1.0):
+        """停止调度线程并松开所有按键"""
+        self.cancel_all()
+        self._stop_event.set()
+        with self._lock:
+            self._wakeup.notify()
+        if self.is_alive():
+            self.join(timeout)
+        # 线程未启动时也要保证按键被松开
+        self._flush_due(float("inf"))
+
+    # ---------- 内部实现 ----------
+
+    def _new_intent(self, tag, keys, end_time):
+        intent = InputIntent(next(self._intent_ids), tag, keys, end_time)
+        self._live[intent.id] = intent
+        if tag is not None:
+            self._by_tag[tag] = intent
+        return intent
+
+    def _schedule(self, when, action, intent_id, key=None):
+        heapq.heappush(self._events, (when, next(self._order), action, intent_id, key))
+
+    def _cancel_locked(self, intent):
+        """标记意图取消，并立即安排松开（需持有锁）"""
+        intent.cancelled = True
+        intent.end_time = 0
+        self._schedule(0, "end", intent.id)
+        if self._by_tag.get(intent.tag) is intent:
+            del self._by_tag[intent.tag]
+
+    def run(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                delay = self._events[0][0] - time.time() if self._events else None
+                if delay is None or delay > 0:
+                    self._wakeup.wait(delay)
+            self._flush_due(time.time())
+
+    def _flush_due(self, now):
+        """执行所有到期事件（在锁外调用按键函数）"""
+        while True:
+            with self._lock:
+                if not self._events or self._events[0][0] > now:
+                    return
+                _, _, action, intent_id, key = heapq.heappop(self._events)
+                calls = self._resolve(action, intent_id, key, now)
+            for func, k in calls:
+                try:
+                    with metrics.timer("input.key_down" if func is self.key_down else "input.key_up"):
+                        func(k)
+                except Exception as e:
+                    log.error("❌ 按键执行错误 %s: %s", k, e)
+
+    def _resolve(self, action, intent_id, key, now):
+        """把事件转换成实际的按键调用（需持有锁）"""
+        intent = self._live.get(intent_id)
+        if intent is None:
+            return []
+
+        if action == "down":
+            if intent.cancelled or key in intent.pressed:
+                return []
+            held_elsewhere = self._is_held(key)
+            intent.pressed.add(key)
+            return [] if held_elsewhere else [(self.key_down, key)]
+
+        # action == "end": 被延长过的意图，旧的结束事件作废
+        if now < intent.end_time - 1e-3:
+            return []
+        del self._live[intent_id]
+        if self._by_tag.get(intent.tag) is intent:
+            del self._by_tag[intent.tag]
+        calls = []
+        for k in intent.pressed:
+            # 其他意图仍按住同一个键时不松开
+            if not self._is_held(k):
+                calls.append((self.key_up, k))
+        intent.pressed.clear()
+        return calls
+
+    def _is_held(self, key):
+        return any(key in intent.pressed for intent in self._live.values())
@@ -0,0 +1,141 @@
+"""
+DNF Bot 性能计时
+热路径上的各阶段（截图、各个 cv2 步骤、各检测器、按键动作、主循环每一拍）用上下文管理器或装饰器计时，
+保留最近若干次的耗时，定期输出 p50/p95/p99 汇总，并可追加写入 JSON Lines 文件供离线分析；
+关闭时 timer() 返回共享的空上下文，装饰器只多一次属性判断，几乎没有额外开销
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+import numpy as np
+from bot_logging import get_logger
+
+log = get_logger("metrics")
+
+
+class _NullTimer:
+    """关闭计时时使用的空上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Instrumentation:
+    """各阶段耗时的滚动统计"""
+
+    def __init__(self, enabled=False, window=500, export_path=None):
+        self.enabled = enabled
+        # 每个阶段保留最近多少次耗时
+        self.window = window
+        # JSON Lines 导出文件，None 表示不导出
+        self.export_path = export_path
+
+        # {阶段名: deque(耗时毫秒)}
+        self.samples = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, window=None, export_path=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if window is not None and window != self.window:
+            self.window = window
+            with self._lock:
+                self.samples = {name: deque(values, maxlen=window) for name, values in self.samples.items()}
+        if export_path is not None:
+            self.export_path = export_path or None
+
+    def timer(self, name):
+        """with metrics.timer("阶段名"): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """装饰器：统计函数每次调用的耗时"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter() - start) * 1000)
+            return wrapper
+        return decorator
+
+    def record(self, name, elapsed_ms):
+        """记录一次耗时（毫秒），可在多个线程中调用"""
+        if not self.enabled:
+            return
+        samples = self.samples.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self.samples.setdefault(name, deque(maxlen=self.window))
+        samples.append(elapsed_ms)
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def stats(self):
+        """{阶段名: {count, p50, p95, p99, max}}（最近 window 次）"""
+        with self._lock:
+            snapshot = {name: list(values) for name, values in self.samples.items()}
+        result = {}
+        for name, values in snapshot.items():
+            if not values:
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            result[name] = {"count": self.counts.get(name, len(values)), "p50": float(p50),
+                            "p95": float(p95), "p99": float(p99), "max": float(max(values))}
+        return result
+
+    def summary(self):
+        """一行汇总：各阶段 p50/p95/p99（毫秒），按 p95 从大到小"""
+        stats = self.stats()
+        if not stats:
+            return "📊 性能计时: 暂无数据" if self.enabled else "📊 性能计时: 未开启"
+        ordered = sorted(stats.items(), key=lambda item: item[1]["p95"], reverse=True)
+        parts = [f"{name} {s['p50']:.1f}/{s['p95']:.1f}/{s['p99']:.1f}" for name, s in ordered]
+        return f"📊 性能计时 p50/p95/p99 ms: {', '.join(parts)}"
+
+    def export(self):
+        """把当前统计追加写入 JSON Lines 文件（每个阶段一行）"""
+        if not self.enabled or not self.export_path:
+            return
+        now = time.time()
+        try:
+            with open(self.export_path, "a", encoding="utf-8") as f:
+                for name, s in self.stats().items():
+                    f.write(json.dumps(dict(time=now, stage=name, **s), ensure_ascii=False) + "\n")
+        except OSError as e:
+            log.warning("⚠️  性能计时导出失败: %s", e)
+
+
+# 全局实例，各模块直接 from instrumentation import metrics 使用
+metrics = Instrumentation()
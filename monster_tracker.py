@@ -0,0 +1,152 @@
+"""
+DNF Bot 怪物跟踪
+把每帧检测到的红色血条关联到已有的跟踪目标上，给每只怪物分配稳定的编号并平滑位置，
+攻击时锁定同一个目标直到它消失；两次整帧发现之间只在已知目标附近的小窗口内确认
+"""
+
+import numpy as np
+from search_regions import merge_rects
+import spatial
+
+
+class MonsterTrack:
+    """单个怪物的跟踪状态"""
+
+    def __init__(self, track_id, x, y, t, confirmed=False):
+        self.id = track_id
+        self.x = float(x)
+        self.y = float(y)
+        self.first_seen = t
+        self.last_seen = t
+        # 连续命中/漏检帧数
+        self.hits = 1
+        self.misses = 0
+        # 连续命中足够帧数后确认为怪物
+        self.confirmed = confirmed
+
+    @property
+    def position(self):
+        return (int(round(self.x)), int(round(self.y)))
+
+
+class MonsterTracker:
+    """多目标跟踪：最近邻关联 + 指数平滑"""
+
+    def __init__(self, match_distance=80, smoothing=0.5, max_misses=5, min_hits=2,
+                 confirm_margin=60, discovery_interval=10):
+        # 检测与目标的最大关联距离（像素）
+        self.match_distance = match_distance
+        # 位置平滑系数（越大越跟随最新检测）
+        self.smoothing = smoothing
+        # 连续漏检超过该帧数后删除目标
+        self.max_misses = max_misses
+        # 连续命中该帧数后才确认为怪物，过滤单帧闪烁的误检
+        self.min_hits = min_hits
+        # 确认窗口在目标周围的边距（像素）
+        self.confirm_margin = confirm_margin
+        # 每隔多少帧做一次整帧发现
+        self.discovery_interval = discovery_interval
+
+        self.tracks = {}
+        self.next_id = 1
+        self.target_id = None
+        self.frames_since_discovery = 0
+        # 已确认的目标消失的累计次数（通常是被击杀，之后该检测掉落物了）
+        self.lost = 0
+
+    def needs_discovery(self):
+        """没有目标或到了发现间隔时需要整帧检测（发现新出现的怪物）"""
+        return not self.tracks or self.frames_since_discovery >= self.discovery_interval
+
+    def confirm_windows(self, width, height):
+        """已知目标附近的确认窗口 [(x0, y0, x1, y1)]"""
+        m = self.confirm_margin
+        rects = merge_rects([(int(t.x) - m, int(t.y) - m, int(t.x) + m, int(t.y) + m)
+                             for t in self.tracks.values()])
+        return [(max(0, x0), max(0, y0), min(width, x1), min(height, y1))
+                for x0, y0, x1, y1 in rects if x1 > 0 and y1 > 0 and x0 < width and y0 < height]
+
+    def update(self, detections, t, discovery=True):
+        """用本帧的检测结果 [(x, y, ...)] 更新目标，返回已确认的目标列表"""
+        if discovery:
+            self.frames_since_discovery = 0
+        else:
+            self.frames_since_discovery += 1
+
+        tracks = list(self.tracks.values())
+        matched_tracks = set()
+        matched_detections = set()
+
+        if tracks and detections:
+            # 距离矩阵，按距离从小到大贪心关联
+            track_xy = np.array([(tr.x, tr.y) for tr in tracks])
+            det_xy = np.array([(d[0], d[1]) for d in detections], dtype=np.float64)
+            dist = np.hypot(track_xy[:, None, 0] - det_xy[None, :, 0],
+                            track_xy[:, None, 1] - det_xy[None, :, 1])
+            for flat in np.argsort(dist, axis=None):
+                ti, di = divmod(int(flat), len(detections))
+                if dist[ti, di] > self.match_distance:
+                    break
+                if ti in matched_tracks or di in matched_detections:
+                    continue
+                matched_tracks.add(ti)
+                matched_detections.add(di)
+
+                track = tracks[ti]
+                track.x += self.smoothing * (det_xy[di, 0] - track.x)
+                track.y += self.smoothing * (det_xy[di, 1] - track.y)
+                track.last_seen = t
+                track.hits += 1
+                track.misses = 0
+                if track.hits >= self.min_hits:
+                    track.confirmed = True
+
+        # 未关联上的目标记一次漏检，超过上限删除
+        for ti, track in enumerate(tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+                track.hits = 0
+                # 未确认的目标漏检一次就删除，已确认的目标允许短暂遮挡
+                if not track.confirmed or track.misses > self.max_misses:
+                    del self.tracks[track.id]
+                    if track.confirmed:
+                        self.lost += 1
+
+        # 未关联上的检测作为新目标
+        for di, detection in enumerate(detections):
+            if di not in matched_detections:
+                track = MonsterTrack(self.next_id, detection[0], detection[1], t,
+                                     confirmed=self.min_hits <= 1)
+                self.tracks[track.id] = track
+                self.next_id += 1
+
+        if self.target_id not in self.tracks:
+            self.target_id = None
+        return self.confirmed()
+
+    def confirmed(self):
+        """已确认的目标（按编号排序）"""
+        return [tr for _, tr in sorted(self.tracks.items()) if tr.confirmed]
+
+    def positions(self):
+        return [tr.position for tr in self.confirmed()]
+
+    def select_target(self, char_pos):
+        """攻击目标：锁定的目标还在就继续攻击它，否则选最近的已确认目标"""
+        if self.target_id in self.tracks:
+            return self.tracks[self.target_id]
+
+        candidates = self.confirmed()
+        if not candidates:
+            self.target_id = None
+            return None
+        index, _ = spatial.nearest(char_pos, [(tr.x, tr.y) for tr in candidates])
+        target = candidates[index]
+        self.target_id = target.id
+        return target
+
+    def clear(self):
+        """换房间时清空所有目标"""
+        self.tracks.clear()
+        self.target_id = None
+        self.frames_since_discovery = 0
@@ -0,0 +1,125 @@
+"""
+DNF Bot 移动控制
+同时按住两个方向键斜向移动，按住时间由剩余距离和测得的移动速度（像素/秒）算出，
+每次移动后用两次真实检测之间的位移修正速度估计，减少到达目标所需的循环次数
+"""
+
+
+class MovementController:
+    """闭环移动控制器"""
+
+    def __init__(self, speed_x=300, speed_y=200, arrive_distance=20, axis_deadzone=10,
+                 min_hold=0.05, max_hold=0.6, adapt_rate=0.3, min_sample_time=0.08,
+                 reference_x=None, reference_y=None):
+        # 横向/纵向移动速度估计（像素/秒），纵向通常更慢
+        self.speed_x = float(speed_x)
+        self.speed_y = float(speed_y)
+        # 速度估计允许的范围（参照速度的 0.3 ~ 3 倍），防止撞墙时估计值被拉到 0；
+        # 参照速度应为校准值或配置值，不能是上次运行修正后的值，否则范围会逐次漂移
+        reference_x = float(reference_x if reference_x is not None else speed_x)
+        reference_y = float(reference_y if reference_y is not None else speed_y)
+        self.speed_limits = ((reference_x * 0.3, reference_x * 3), (reference_y * 0.3, reference_y * 3))
+        self.speed_x = min(self.speed_limits[0][1], max(self.speed_limits[0][0], self.speed_x))
+        self.speed_y = min(self.speed_limits[1][1], max(self.speed_limits[1][0], self.speed_y))
+        # 距离目标小于该值视为到达
+        self.arrive_distance = arrive_distance
+        # 单个轴剩余距离小于该值时不再按该方向键
+        self.axis_deadzone = axis_deadzone
+        # 单次按住时间范围：上限保证每隔一段时间重新用检测位置修正方向
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        # 速度估计的更新系数
+        self.adapt_rate = adapt_rate
+        # 按住时间太短的样本受按键延迟影响大，不用于估计速度
+        self.min_sample_time = min_sample_time
+
+        # 当前移动指令：(方向, 起点检测位置, 开始时间, 结束时间)
+        self.command = None
+
+        # 统计：发出的移动指令数（同方向延长不计）、到达次数
+        self.commands = 0
+        self.arrivals = 0
+        # 上次到达之后是否发出过移动指令（原地就到达的不计入）
+        self.travelling = False
+
+    def plan(self, char_pos, target):
+        """计算本次移动，返回 ((dx, dy), 按住秒数)；已到达返回 None
+
+        dx, dy 取值 -1/0/1，两个都不为 0 时斜向移动
+        """
+        diff_x = target[0] - char_pos[0]
+        diff_y = target[1] - char_pos[1]
+        if (diff_x ** 2 + diff_y ** 2) ** 0.5 < self.arrive_distance:
+            return None
+
+        dx = 0 if abs(diff_x) <= self.axis_deadzone else (1 if diff_x > 0 else -1)
+        dy = 0 if abs(diff_y) <= self.axis_deadzone else (1 if diff_y > 0 else -1)
+        if dx == 0 and dy == 0:
+            return None
+
+        # 两个轴都要走时，先斜向走到较近的那个轴对齐，之后再单轴移动
+        times = []
+        if dx:
+            times.append(abs(diff_x) / self.speed_x)
+        if dy:
+            times.append(abs(diff_y) / self.speed_y)
+        duration = min(max(min(times), self.min_hold), self.max_hold)
+        return (dx, dy), duration
+
+    def velocity(self, direction):
+        """某个方向的移动速度向量（像素/秒）"""
+        return direction[0] * self.speed_x, direction[1] * self.speed_y
+
+    def command_started(self, direction, duration, measurement, t):
+        """记录发出的移动指令；measurement 为最近一次真实检测 (x, y, 时间) 或 None"""
+        self.travelling = True
+        if self.command is not None:
+            current, start, start_t, end_t = self.command
+            if current == direction and t < end_t:
+                # 同方向继续移动：只延长结束时间，速度样本从原起点算起
+                self.command = (current, start, start_t, t + duration)
+                return
+        self.commands += 1
+        start = (measurement[0], measurement[1]) if measurement is not None else None
+        self.command = (direction, start, t, t + duration)
+
+    def stop(self, t, arrived=False):
+        """移动被取消或已到达"""
+        if self.command is not None:
+            direction, start, start_t, end_t = self.command
+            self.command = (direction, start, start_t, min(end_t, t))
+        if arrived and self.travelling:
+            self.arrivals += 1
+            self.travelling = False
+
+    def observe(self, measurement):
+        """用指令开始后的一次真实检测修正速度估计"""
+        if self.command is None or measurement is None:
+            return
+        direction, start, start_t, end_t = self.command
+        mx, my, mt = measurement
+        if start is None:
+            return
+
+        held = min(mt, end_t) - start_t
+        if held < self.min_sample_time:
+            return
+
+        for axis, (moved, step) in enumerate(((mx - start[0], direction[0]), (my - start[1], direction[1]))):
+            if step == 0:
+                continue
+            observed = max(0.0, moved * step) / held
+            low, high = self.speed_limits[axis]
+            if axis == 0:
+                self.speed_x = min(high, max(low, self.speed_x + self.adapt_rate * (observed - self.speed_x)))
+            else:
+                self.speed_y = min(high, max(low, self.speed_y + self.adapt_rate * (observed - self.speed_y)))
+
+        # 之后的样本从这次检测开始算，避免同一段位移被重复计入
+        self.command = (direction, (mx, my), mt, end_t)
+
+    def report(self):
+        """格式化的移动统计"""
+        per_target = self.commands / self.arrivals if self.arrivals else float(self.commands)
+        return (f"🚶 移动: 速度 {self.speed_x:.0f}/{self.speed_y:.0f} px/s, "
+                f"指令 {self.commands} 次, 到达 {self.arrivals} 次 (平均每个目标 {per_target:.1f} 次)")
@@ -0,0 +1,121 @@
+"""
+DNF Bot 过图检测
+按下进门键后在低分辨率灰度图上观察整帧亮度和直方图的变化：
+出现淡出黑屏或整帧直方图突变说明正在过图，画面亮度恢复并稳定后立即恢复检测；
+按键后一段时间内画面没有明显变化则判定进门失败，主循环马上重试，不再固定等待 door_enter 秒；
+过图超过最长时间仍未稳定时单独报告为超时（等到不再黑屏才结束），超时的耗时不计入过图时间统计
+"""
+
+import time
+import cv2
+from frame import Frame
+from instrumentation import metrics
+
+
+class RoomTransitionDetector:
+    """进门后的过图状态判断"""
+
+    WAITING = "waiting"            # 已按进门键，画面还没有变化
+    TRANSITIONING = "transitioning"  # 正在过图（黑屏或画面切换中）
+    DONE = "done"                  # 新房间已显示
+    TIMED_OUT = "timed_out"        # 过图超时（画面一直没有稳定）
+    FAILED = "failed"              # 进门失败（画面没有变化）
+
+    def __init__(self, level=3, bins=32, change_threshold=0.4, dark_ratio=0.5, start_timeout=0.8,
+                 settle_frames=2, settle_threshold=0.1, max_duration=6.0):
+        # 使用的金字塔层（3 = 1/8 分辨率）
+        self.level = level
+        self.bins = bins
+        # 与进门前的直方图距离（Bhattacharyya）超过该值视为画面切换
+        self.change_threshold = change_threshold
+        # 平均亮度低于进门前的该比例视为黑屏
+        self.dark_ratio = dark_ratio
+        # 按键后多久还没有变化判定为进门失败（秒）
+        self.start_timeout = start_timeout
+        # 新画面连续稳定多少帧视为过图完成，稳定指相邻帧直方图距离低于 settle_threshold
+        self.settle_frames = settle_frames
+        self.settle_threshold = settle_threshold
+        # 过图最长时间（秒），超时后画面不再黑屏时结束；一直黑屏则最多再等同样长的时间
+        self.max_duration = max_duration
+
+        self.state = None
+        self.start_time = 0.0
+        self.baseline = None
+        self.brightness = 0.0
+        self.previous = None
+        self.stable = 0
+
+        # 统计：成功次数、失败次数、超时次数、最近一次（成功的）过图耗时
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.last_duration = None
+
+    @metrics.timed("cv2.transition_histogram")
+    def _histogram(self, frame):
+        small = frame.gray_pyramid(self.level)
+        hist = cv2.calcHist([small], [0], None, [self.bins], [0, 256])
+        cv2.normalize(hist, hist, 1.0, 0.0, cv2.NORM_L1)
+        return hist, float(small.mean())
+
+    @property
+    def active(self):
+        return self.state in (self.WAITING, self.TRANSITIONING)
+
+    def begin(self, frame, t=None, max_duration=None):
+        """按下进门键时调用，记录进门前的画面"""
+        frame = Frame.wrap(frame)
+        if max_duration is not None:
+            self.max_duration = max_duration
+        self.baseline, self.brightness = self._histogram(frame)
+        self.previous = self.baseline
+        self.start_time = t if t is not None else time.time()
+        self.state = self.WAITING
+        self.stable = 0
+
+    def observe(self, frame, t=None):
+        """处理过图期间的一帧，返回当前状态"""
+        if not self.active:
+            return self.state
+        frame = Frame.wrap(frame)
+        t = t if t is not None else frame.timestamp
+        elapsed = t - self.start_time
+        hist, brightness = self._histogram(frame)
+
+        dark = brightness < self.brightness * self.dark_ratio
+        changed = cv2.compareHist(self.baseline, hist, cv2.HISTCMP_BHATTACHARYYA) > self.change_threshold
+        steady = cv2.compareHist(self.previous, hist, cv2.HISTCMP_BHATTACHARYYA) < self.settle_threshold
+        self.previous = hist
+
+        if self.state == self.WAITING:
+            if dark or changed:
+                self.state = self.TRANSITIONING
+            elif elapsed >= self.start_timeout:
+                return self._finish(self.FAILED, elapsed)
+            return self.state
+
+        # 黑屏结束、画面稳定后过图完成
+        if not dark and steady:
+            self.stable += 1
+            if self.stable >= self.settle_frames:
+                return self._finish(self.DONE, elapsed)
+        else:
+            self.stable = 0
+        if elapsed >= self.max_duration * 2 or (elapsed >= self.max_duration and not dark):
+            return self._finish(self.TIMED_OUT, elapsed)
+        return self.state
+
+    def _finish(self, state, elapsed):
+        self.state = state
+        if state == self.DONE:
+            self.completed += 1
+            self.last_duration = elapsed
+        elif state == self.TIMED_OUT:
+            self.timed_out += 1
+        else:
+            self.failed += 1
+        return state
+
+    def report(self):
+        last = f", 最近一次 {self.last_duration:.2f}s" if self.last_duration is not None else ""
+        return f"🚪 过图: 成功 {self.completed} 次, 超时 {self.timed_out} 次, 进门失败 {self.failed} 次{last}"
@@ -0,0 +1,132 @@
+"""
+DNF Bot 拾取路线规划
+金币和材料合并成一组拾取点，用最近邻构造初始路线再用 2-opt 消除交叉，
+路线跨帧保持：已拾取的点从路线中删除，新出现的点插入到代价最小的位置，
+不再每帧按检测顺序来回走
+"""
+
+import numpy as np
+import spatial
+
+
+def route_length(start, route):
+    """从 start 出发依次经过 route 的总路程"""
+    length = 0.0
+    x, y = start
+    for px, py in route:
+        length += float(np.hypot(px - x, py - y))
+        x, y = px, py
+    return length
+
+
+def two_opt(start, route, max_passes=10):
+    """2-opt 改进开放路线（起点固定、终点不回到起点），返回新路线"""
+    if len(route) < 3:
+        return list(route)
+
+    points = [start] + list(route)
+    xy = spatial.as_points(points)
+    dist = np.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+    order = list(range(len(points)))
+    n = len(order)
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            for k in range(i + 1, n):
+                c = order[k]
+                # 翻转 order[i..k]：断开 a-b 和 c-d，连接 a-c 和 b-d（k 为终点时没有 d）
+                delta = dist[a, c] - dist[a, b]
+                if k + 1 < n:
+                    d = order[k + 1]
+                    delta += dist[b, d] - dist[c, d]
+                if delta < -1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    b = order[i]
+                    improved = True
+        if not improved:
+            break
+
+    return [points[i] for i in order[1:]]
+
+
+def plan_route(start, points, max_passes=10):
+    """最近邻 + 2-opt 规划访问顺序"""
+    greedy = [points[i] for i in spatial.greedy_order(start, points)]
+    return two_opt(start, greedy, max_passes)
+
+
+class PickupPlanner:
+    """跨帧保持的拾取路线"""
+
+    def __init__(self, match_distance=40, max_passes=10):
+        # 本帧检测到的物品与路线上的点的最大关联距离（像素）
+        self.match_distance = match_distance
+        self.max_passes = max_passes
+        # [(x, y)] 按访问顺序
+        self.route = []
+
+        # 统计：完整重新规划次数、增量插入的点数
+        self.replans = 0
+        self.insertions = 0
+
+    def update(self, char_pos, items):
+        """用本帧的物品 [(x, y, ...)] 更新路线，返回新路线"""
+        if not items:
+            self.route = []
+            return []
+
+        points = [(int(item[0]), int(item[1])) for item in items]
+        used = np.zeros(len(points), dtype=bool)
+
+        # 路线上的点关联到本帧最近的物品，关联不上的视为已拾取
+        kept = []
+        for stop in self.route:
+            dist = spatial.distances(stop, points)
+            dist[used] = np.inf
+            index = int(np.argmin(dist))
+            if dist[index] <= self.match_distance:
+                used[index] = True
+                kept.append(points[index])
+
+        new_points = [p for p, u in zip(points, used) if not u]
+        if not kept:
+            self.route = plan_route(char_pos, new_points, self.max_passes)
+            self.replans += 1
+            return list(self.route)
+
+        route = kept
+        for point in new_points:
+            route = self._insert(char_pos, route, point)
+            self.insertions += 1
+        if new_points or len(kept) < len(self.route):
+            route = two_opt(char_pos, route, self.max_passes)
+
+        self.route = route
+        return list(route)
+
+    def _insert(self, start, route, point):
+        """把 point 插入到使总路程增加最少的位置"""
+        best_index, best_cost = len(route), None
+        prev = start
+        for i, stop in enumerate(route + [None]):
+            cost = spatial.distance(prev, point)
+            if stop is not None:
+                cost += spatial.distance(point, stop) - spatial.distance(prev, stop)
+            if best_cost is None or cost < best_cost:
+                best_index, best_cost = i, cost
+            prev = stop
+        return route[:best_index] + [point] + route[best_index:]
+
+    def next_stop(self):
+        """路线上的下一个拾取点，没有时为 None"""
+        return self.route[0] if self.route else None
+
+    def reached(self):
+        """已到达并拾取下一个点"""
+        if self.route:
+            self.route.pop(0)
+
+    def clear(self):
+        self.route = []
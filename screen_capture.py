@@ -0,0 +1,84 @@
+"""
+DNF Bot 屏幕截图
+直接把 mss 的 BGRA 缓冲区包装成 numpy 视图，一次 cvtColor 写入预分配的缓冲区，
+省去 PIL 中转的多次整帧拷贝，并统计截图耗时
+"""
+
+import time
+from collections import deque
+import cv2
+import numpy as np
+from mss import mss
+from instrumentation import metrics
+
+
+class ScreenCapture:
+    """零拷贝截图后端"""
+
+    def __init__(self, region, keep_alpha=False, buffer_count=2, sct=None):
+        self.region = region
+        # 为True时直接返回BGRA视图（仅供能处理4通道的调用方使用）
+        self.keep_alpha = keep_alpha
+        self.sct = sct if sct is not None else mss()
+
+        # 轮流使用的输出缓冲区：上一帧在下一次截图后仍然有效
+        self.buffer_count = max(1, buffer_count)
+        self._buffers = []
+        self._buffer_index = 0
+
+        # 最近的截图耗时（毫秒）
+        self.latencies = deque(maxlen=120)
+        self.frame_count = 0
+
+    def _next_buffer(self, height, width):
+        """取下一个预分配缓冲区，尺寸变化时重新分配"""
+        if not self._buffers or self._buffers[0].shape[:2] != (height, width):
+            self._buffers = [np.empty((height, width, 3), dtype=np.uint8)
+                             for _ in range(self.buffer_count)]
+            self._buffer_index = 0
+
+        buffer = self._buffers[self._buffer_index]
+        self._buffer_index = (self._buffer_index + 1) % self.buffer_count
+        return buffer
+
+    def grab(self, out=None):
+        """截取一帧，返回BGR图像（keep_alpha时返回BGRA视图）
+
+        out: 可选的目标数组，传入时直接写入该数组
+        """
+        start = time.perf_counter()
+
+        shot = self.sct.grab(self.region)
+        # mss 的原始缓冲区就是 BGRA 排列，直接构造视图，不拷贝
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+        if self.keep_alpha and out is None:
+            image = bgra
+        else:
+            if out is None:
+                out = self._next_buffer(shot.height, shot.width)
+            # 丢弃alpha通道，一次转换直接写入目标缓冲区
+            image = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.latencies.append(elapsed)
+        metrics.record("capture.grab", elapsed)
+        self.frame_count += 1
+        return image
+
+    def stats(self):
+        """截图耗时统计（毫秒）"""
+        if not self.latencies:
+            return {"frames": 0, "last_ms": 0.0, "avg_ms": 0.0, "max_ms": 0.0}
+        return {
+            "frames": self.frame_count,
+            "last_ms": self.latencies[-1],
+            "avg_ms": sum(self.latencies) / len(self.latencies),
+            "max_ms": max(self.latencies)
+        }
+
+    def report(self):
+        """格式化的截图耗时报告"""
+        s = self.stats()
+        return (f"📷 截图耗时: 平均 {s['avg_ms']:.1f}ms, 最近 {s['last_ms']:.1f}ms, "
+                f"最大 {s['max_ms']:.1f}ms (共 {s['frames']} 帧)")
@@ -0,0 +1,105 @@
+"""
+DNF Bot 模板搜索区域
+每类模板只在配置的区域内匹配（门在房间边缘，掉落物在地面带），
+命中后下一帧只在上次位置附近搜索，未命中时再放宽到整个配置区域
+"""
+
+
+def merge_rects(rects):
+    """合并相交的矩形，避免重叠区域重复匹配"""
+    rects = [list(r) for r in rects]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        while rects:
+            x0, y0, x1, y1 = rects.pop()
+            i = 0
+            while i < len(rects):
+                a0, b0, a1, b1 = rects[i]
+                if a0 <= x1 and x0 <= a1 and b0 <= y1 and y0 <= b1:
+                    x0, y0, x1, y1 = min(x0, a0), min(y0, b0), max(x1, a1), max(y1, b1)
+                    rects.pop(i)
+                    merged = True
+                else:
+                    i += 1
+            result.append([x0, y0, x1, y1])
+        rects = result
+    return [tuple(r) for r in rects]
+
+
+class SearchRegionTracker:
+    """按模板记录上次命中位置，给出本帧的搜索区域"""
+
+    def __init__(self, class_regions, margin=60, full_search_interval=30):
+        # {模板类别: [(x0, y0, x1, y1), ...]}，坐标为画面宽高的比例
+        self.class_regions = class_regions
+        self.margin = margin
+        # 连续使用动态区域多少帧后强制搜索一次完整区域（发现新目标）
+        self.full_search_interval = full_search_interval
+
+        # {模板名: [(cx, cy), ...]} 上一帧的命中中心
+        self.last_hits = {}
+        self.frames_since_full = {}
+
+        # 统计：动态区域搜索次数 / 完整区域搜索次数
+        self.roi_searches = 0
+        self.full_searches = 0
+
+    def static_regions(self, group, width, height, template_w=0, template_h=0):
+        """某类模板配置的搜索区域（像素坐标），未配置时为整帧
+
+        配置的区域是模板中心允许出现的范围，裁剪时向外扩展半个模板，
+        保证跨越区域边界的目标也能完整匹配
+        """
+        fractions = self.class_regions.get(group) if group else None
+        if not fractions:
+            return [(0, 0, width, height)]
+        half_w, half_h = template_w // 2 + 1, template_h // 2 + 1
+        rects = []
+        for fx0, fy0, fx1, fy1 in fractions:
+            rects.append((int(fx0 * width) - half_w, int(fy0 * height) - half_h,
+                          int(fx1 * width) + half_w, int(fy1 * height) + half_h))
+        return rects
+
+    def regions(self, group, name, width, height, template_w, template_h):
+        """本帧 name 模板需要搜索的区域列表 [(x0, y0, x1, y1)]
+
+        区域是截图上的裁剪范围，至少能容纳一个模板
+        """
+        hits = self.last_hits.get(name)
+        since_full = self.frames_since_full.get(name, 0)
+
+        if hits and since_full < self.full_search_interval:
+            # 动态区域：上次命中位置附近
+            self.frames_since_full[name] = since_full + 1
+            self.roi_searches += 1
+            half_w = template_w // 2 + self.margin
+            half_h = template_h // 2 + self.margin
+            rects = merge_rects([(cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+                                 for cx, cy in hits])
+        else:
+            self.frames_since_full[name] = 0
+            self.full_searches += 1
+            rects = self.static_regions(group, width, height, template_w, template_h)
+
+        regions = []
+        for x0, y0, x1, y1 in rects:
+            x0, y0 = max(0, x0), max(0, y0)
+            x1, y1 = min(width, x1), min(height, y1)
+            if x1 - x0 >= template_w and y1 - y0 >= template_h:
+                regions.append((x0, y0, x1, y1))
+        return regions
+
+    def reset(self):
+        """进入新房间：上一个房间的命中位置作废，下一帧所有模板都搜索完整区域"""
+        self.last_hits.clear()
+        self.frames_since_full.clear()
+
+    def update(self, name, matches):
+        """记录本帧命中结果；未命中时下一帧放宽到完整区域"""
+        if matches:
+            self.last_hits[name] = [(int(m[0]), int(m[1])) for m in matches]
+        else:
+            self.last_hits.pop(name, None)
+            self.frames_since_full[name] = 0
@@ -0,0 +1,110 @@
+"""
+DNF Bot 空间查询
+角色、怪物、物品、门的坐标查询：最近、k 近邻、半径内、贪心拾取顺序，
+用 NumPy 一次算出所有距离，代替逐个目标的 Python 距离计算；
+以及网格分桶的重复点抑制
+"""
+
+import numpy as np
+
+
+def as_points(points):
+    """[(x, y, ...)] -> (N, 2) 浮点数组"""
+    if len(points) == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    return np.array([(p[0], p[1]) for p in points], dtype=np.float64)
+
+
+def distances(origin, points):
+    """origin 到每个点的距离"""
+    xy = as_points(points)
+    return np.hypot(xy[:, 0] - origin[0], xy[:, 1] - origin[1])
+
+
+def distance(a, b):
+    """两点间距离"""
+    return float(np.hypot(a[0] - b[0], a[1] - b[1]))
+
+
+def nearest(origin, points):
+    """最近的点，返回 (下标, 距离)；没有点时返回 (None, None)"""
+    if len(points) == 0:
+        return None, None
+    dist = distances(origin, points)
+    index = int(np.argmin(dist))
+    return index, float(dist[index])
+
+
+def k_nearest(origin, points, k):
+    """最近的 k 个点的下标，按距离从近到远"""
+    if len(points) == 0 or k <= 0:
+        return []
+    dist = distances(origin, points)
+    if k < len(dist):
+        candidates = np.argpartition(dist, k - 1)[:k]
+    else:
+        candidates = np.arange(len(dist))
+    return [int(i) for i in candidates[np.argsort(dist[candidates], kind="stable")]]
+
+
+def within_radius(origin, points, radius):
+    """距离不超过 radius 的点的下标，按距离从近到远"""
+    if len(points) == 0:
+        return []
+    dist = distances(origin, points)
+    inside = np.flatnonzero(dist <= radius)
+    return [int(i) for i in inside[np.argsort(dist[inside], kind="stable")]]
+
+
+def greedy_order(origin, points):
+    """从 origin 出发每次走向最近的未访问点，返回访问顺序（下标列表）"""
+    xy = as_points(points)
+    remaining = np.ones(len(xy), dtype=bool)
+    order = []
+    x, y = origin[0], origin[1]
+    for _ in range(len(xy)):
+        dist = np.hypot(xy[:, 0] - x, xy[:, 1] - y)
+        dist[~remaining] = np.inf
+        index = int(np.argmin(dist))
+        order.append(index)
+        remaining[index] = False
+        x, y = xy[index]
+    return order
+
+
+def suppress_duplicates(matches, min_distance):
+    """网格分桶的非极大值抑制：保留得分最高的点，去掉 min_distance 内的其他点
+
+    matches: [(x, y, confidence, ...)]，没有 confidence 的按 0 处理
+    """
+    if not matches:
+        return []
+
+    ordered = sorted(matches, key=lambda m: m[2] if len(m) > 2 else 0, reverse=True)
+    cell = max(1, int(min_distance))
+    min_dist_sq = min_distance * min_distance
+    buckets = {}
+    kept = []
+
+    for match in ordered:
+        x, y = match[0], match[1]
+        gx, gy = int(x) // cell, int(y) // cell
+
+        # 只需要检查相邻的 3x3 个格子
+        duplicate = False
+        for nx in (gx - 1, gx, gx + 1):
+            for ny in (gy - 1, gy, gy + 1):
+                for ux, uy in buckets.get((nx, ny), ()):
+                    if (x - ux) ** 2 + (y - uy) ** 2 < min_dist_sq:
+                        duplicate = True
+                        break
+                if duplicate:
+                    break
+            if duplicate:
+                break
+
+        if not duplicate:
+            kept.append(match)
+            buckets.setdefault((gx, gy), []).append((x, y))
+
+    return kept
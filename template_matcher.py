@@ -0,0 +1,208 @@
+"""
+DNF Bot 金字塔模板匹配
+先在缩小的金字塔层上粗匹配找候选位置，再回到原分辨率只在候选附近的小窗口内精匹配，
+匹配代价从 O(W·H·w·h) 降到约 1/4^level；
+一组模板（如4种门）可以在同一张预处理好的截图上批量匹配，合并响应图后按位置给出最佳模板
+"""
+
+import cv2
+import numpy as np
+from frame import Frame
+from search_regions import merge_rects
+from spatial import suppress_duplicates
+from instrumentation import metrics
+
+
+def extract_peaks(res, threshold, min_distance, max_peaks=50):
+    """从响应图中提取局部极大值，返回 [(x, y, confidence)]，按得分从高到低
+
+    用膨胀求邻域最大值代替逐像素 np.where，候选数量最多 max_peaks 个，与阈值高低无关
+    """
+    radius = max(1, int(min_distance) // 2)
+    kernel = np.ones((2 * radius + 1, 2 * radius + 1), np.uint8)
+    local_max = cv2.dilate(res, kernel)
+
+    ys, xs = np.nonzero((res >= threshold) & (res >= local_max))
+    if len(xs) == 0:
+        return []
+
+    scores = res[ys, xs]
+    if len(scores) > max_peaks:
+        keep = np.argpartition(scores, -max_peaks)[-max_peaks:]
+        xs, ys, scores = xs[keep], ys[keep], scores[keep]
+    order = np.argsort(scores)[::-1]
+
+    peaks = [(int(xs[i]), int(ys[i]), float(scores[i])) for i in order]
+    # 平顶区域会产生多个相等的极大值，再做一次非极大值抑制
+    return suppress_duplicates(peaks, min_distance)
+
+
+class PyramidMatcher:
+    """由粗到细的模板匹配引擎"""
+
+    def __init__(self, level=1, coarse_slack=0.1, refine_margin=6, max_candidates=20,
+                 min_template_size=12, min_distance=50, max_peaks=50):
+        # 粗匹配所用的金字塔层（1 = 1/2, 2 = 1/4）
+        self.level = level
+        # 粗匹配阈值放宽量（缩小后相关系数会略有下降）
+        self.coarse_slack = coarse_slack
+        # 精匹配窗口在候选位置周围的额外边距（原分辨率像素）
+        self.refine_margin = refine_margin
+        self.max_candidates = max_candidates
+        # 模板缩小后短边低于该值时降低金字塔层，避免特征丢失
+        self.min_template_size = min_template_size
+        # 峰值之间的最小距离和每个窗口最多返回的峰值数
+        self.min_distance = min_distance
+        self.max_peaks = max_peaks
+
+    def _pick_level(self, entry):
+        level = self.level
+        while level > 0 and min(entry.width, entry.height) / (2 ** level) < self.min_template_size:
+            level -= 1
+        return level
+
+    def match(self, frame, entry, threshold, region=None, use_gray=False):
+        """匹配单个模板，返回 [(x, y, confidence)]（模板左上角，整帧坐标）"""
+        frame = Frame.wrap(frame)
+        level = self._pick_level(entry)
+        full = frame.gray if use_gray else frame.image
+        template = entry.gray if use_gray else entry.color
+
+        if region is None:
+            region = (0, 0, frame.width, frame.height)
+
+        if level == 0:
+            return self._match_window(full, template, threshold, region)
+
+        # 1. 粗匹配：在金字塔层上找候选
+        factor = 2 ** level
+        coarse_image = frame.gray_pyramid(level) if use_gray else frame.pyramid(level)
+        color_t, gray_t, _ = entry.at_scale(1.0 / factor)
+        coarse_template = gray_t if use_gray else color_t
+
+        cx0, cy0 = region[0] // factor, region[1] // factor
+        cx1, cy1 = region[2] // factor, region[3] // factor
+        coarse = coarse_image[cy0:cy1, cx0:cx1]
+        th, tw = coarse_template.shape[:2]
+        if coarse.shape[0] < th or coarse.shape[1] < tw:
+            return self._match_window(full, template, threshold, region)
+
+        with metrics.timer("cv2.match_template"):
+            res = cv2.matchTemplate(coarse, coarse_template, cv2.TM_CCOEFF_NORMED)
+        peaks = extract_peaks(res, threshold - self.coarse_slack,
+                              max(1, self.min_distance // factor), self.max_candidates)
+        if not peaks:
+            return []
+
+        # 2. 精匹配：候选位置映射回原分辨率，在小窗口内匹配
+        margin = factor + self.refine_margin
+        windows = []
+        for x, y, _ in peaks:
+            fx, fy = (x + cx0) * factor, (y + cy0) * factor
+            windows.append((fx - margin, fy - margin,
+                            fx + entry.width + margin, fy + entry.height + margin))
+
+        matches = []
+        for x0, y0, x1, y1 in merge_rects(windows):
+            window = (max(region[0], x0), max(region[1], y0),
+                      min(region[2], x1), min(region[3], y1))
+            matches.extend(self._match_window(full, template, threshold, window))
+        return matches
+
+    def match_set(self, frame, entries, threshold, regions=None, use_gray=False, executor=None):
+        """批量匹配一组模板，返回 [(中心x, 中心y, confidence, 模板名)]
+
+        各模板的响应图按模板中心对齐后合并成一张得分图，每个位置只保留得分最高的模板；
+        regions: {模板名: [(x0, y0, x1, y1)]}，缺省为整帧
+        executor: 可选线程池，各模板的 matchTemplate 并行执行（OpenCV 会释放 GIL）
+        """
+        frame = Frame.wrap(frame)
+        if regions is not None:
+            entries = [e for e in entries if regions.get(e.name)]
+        if not entries:
+            return []
+
+        # 所有模板使用同一金字塔层，才能合并响应图
+        level = min(self._pick_level(e) for e in entries)
+        factor = 2 ** level
+        # 并行之前先生成预处理图像，避免多个线程重复计算
+        full = frame.gray if use_gray else frame.image
+        if use_gray:
+            image = frame.gray_pyramid(level)
+        else:
+            image = frame.pyramid(level)
+        height, width = image.shape[:2]
+
+        def respond(entry):
+            color_t, gray_t, _ = entry.at_scale(1.0 / factor)
+            template = gray_t if use_gray else color_t
+            th, tw = template.shape[:2]
+            outputs = []
+            entry_regions = regions[entry.name] if regions is not None else [(0, 0, frame.width, frame.height)]
+            for x0, y0, x1, y1 in entry_regions:
+                cx0, cy0 = x0 // factor, y0 // factor
+                crop = image[cy0:y1 // factor, cx0:x1 // factor]
+                if crop.shape[0] < th or crop.shape[1] < tw:
+                    continue
+                with metrics.timer("cv2.match_template"):
+                    res = cv2.matchTemplate(crop, template, cv2.TM_CCOEFF_NORMED)
+                # 左上角坐标 -> 模板中心坐标
+                outputs.append((cx0 + tw // 2, cy0 + th // 2, res))
+            return outputs
+
+        if executor is not None:
+            responses = list(executor.map(respond, entries))
+        else:
+            responses = [respond(entry) for entry in entries]
+
+        # 合并响应图：得分图取最大值，标签图记录对应模板
+        score = np.full((height, width), -1.0, dtype=np.float32)
+        label = np.full((height, width), -1, dtype=np.int16)
+        for index, outputs in enumerate(responses):
+            for ox, oy, res in outputs:
+                rh, rw = res.shape
+                score_view = score[oy:oy + rh, ox:ox + rw]
+                label_view = label[oy:oy + rh, ox:ox + rw]
+                better = res > score_view
+                score_view[better] = res[better]
+                label_view[better] = index
+
+        coarse_threshold = threshold - self.coarse_slack if level > 0 else threshold
+        peaks = extract_peaks(score, coarse_threshold, max(1, self.min_distance // factor),
+                              self.max_peaks)
+
+        if level == 0:
+            return [(x, y, confidence, entries[label[y, x]].name) for x, y, confidence in peaks]
+
+        # 精匹配：每个候选只用该位置得分最高的模板，在原分辨率小窗口内确认
+        margin = factor + self.refine_margin
+        windows = {}
+        for x, y, _ in peaks:
+            entry = entries[label[y, x]]
+            fx = x * factor - entry.width // 2
+            fy = y * factor - entry.height // 2
+            windows.setdefault(entry.name, (entry, []))[1].append(
+                (fx - margin, fy - margin, fx + entry.width + margin, fy + entry.height + margin))
+
+        matches = []
+        for entry, rects in windows.values():
+            template = entry.gray if use_gray else entry.color
+            for x0, y0, x1, y1 in merge_rects(rects):
+                window = (max(0, x0), max(0, y0), min(frame.width, x1), min(frame.height, y1))
+                for x, y, confidence in self._match_window(full, template, threshold, window):
+                    matches.append((x + entry.width // 2, y + entry.height // 2, confidence, entry.name))
+
+        return suppress_duplicates(matches, self.min_distance)
+
+    def _match_window(self, image, template, threshold, window):
+        """在指定窗口内做原分辨率匹配"""
+        x0, y0, x1, y1 = window
+        sub = image[y0:y1, x0:x1]
+        th, tw = template.shape[:2]
+        if sub.shape[0] < th or sub.shape[1] < tw:
+            return []
+
+        with metrics.timer("cv2.match_template"):
+            res = cv2.matchTemplate(sub, template, cv2.TM_CCOEFF_NORMED)
+        peaks = extract_peaks(res, threshold, self.min_distance, self.max_peaks)
+        return [(x + x0, y + y0, confidence) for x, y, confidence in peaks]
@@ -0,0 +1,139 @@
+"""
+DNF Bot 模板注册表
+启动时一次性加载所有模板，预计算彩色/灰度/掩码及多尺度版本，
+检测时只读内存，不再访问磁盘
+"""
+
+import os
+import time
+import cv2
+import numpy as np
+from bot_logging import get_logger
+
+log = get_logger("templates")
+
+
+class TemplateEntry:
+    """单个模板及其预处理结果"""
+
+    def __init__(self, name, path, image, mtime, scales):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+
+        # 原图可能带透明通道，拆分出掩码
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+        elif image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        alpha = image[:, :, 3]
+
+        self.color = np.ascontiguousarray(image[:, :, :3])
+        self.gray = cv2.cvtColor(self.color, cv2.COLOR_BGR2GRAY)
+        # 完全不透明的模板不需要掩码
+        self.mask = None if alpha.min() == 255 else (alpha > 0).astype(np.uint8) * 255
+
+        self.height, self.width = self.gray.shape
+
+        # 多尺度版本: {scale: (color, gray, mask)}
+        self.scales = {}
+        for scale in scales:
+            self.scales[scale] = self._build_scale(scale)
+
+    def _build_scale(self, scale):
+        """生成指定缩放比例的模板"""
+        if scale == 1.0:
+            return (self.color, self.gray, self.mask)
+
+        w = max(1, int(round(self.width * scale)))
+        h = max(1, int(round(self.height * scale)))
+        color = cv2.resize(self.color, (w, h), interpolation=cv2.INTER_AREA)
+        gray = cv2.resize(self.gray, (w, h), interpolation=cv2.INTER_AREA)
+        mask = None
+        if self.mask is not None:
+            mask = cv2.resize(self.mask, (w, h), interpolation=cv2.INTER_NEAREST)
+        return (color, gray, mask)
+
+    def at_scale(self, scale):
+        """获取指定比例的 (color, gray, mask)，未预计算时按需生成并缓存"""
+        if scale not in self.scales:
+            self.scales[scale] = self._build_scale(scale)
+        return self.scales[scale]
+
+
+class TemplateRegistry:
+    """模板注册表 - 预加载 + 热重载"""
+
+    def __init__(self, templates_dir, groups, scales=(1.0,), reload_interval=2.0):
+        self.templates_dir = templates_dir
+        self.groups = groups
+        self.scales = tuple(scales)
+        self.reload_interval = reload_interval
+
+        self.entries = {}
+        self.last_check_time = 0
+
+        self.load_all()
+
+    def load_all(self):
+        """加载配置中的所有模板"""
+        entries = {}
+        for names in self.groups.values():
+            for name in names:
+                entry = self._load(os.path.join(self.templates_dir, name))
+                if entry is not None:
+                    entries[name] = entry
+        self.entries = entries
+        log.info("🖼️ 已预加载 %d 个模板", len(entries))
+
+    def _load(self, path):
+        """从磁盘加载单个模板，失败返回None"""
+        name = os.path.basename(path)
+        if not os.path.exists(path):
+            log.warning("警告: 模板文件不存在: %s", path)
+            return None
+
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            log.warning("警告: 无法加载模板图片: %s", path)
+            return None
+
+        return TemplateEntry(name, path, image, os.path.getmtime(path), self.scales)
+
+    def get(self, name):
+        """按文件名获取模板（纯内存查询）"""
+        return self.entries.get(os.path.basename(name))
+
+    def poll(self):
+        """检查模板目录是否有变化，有则重新加载对应模板
+
+        按 reload_interval 节流，由主循环调用，检测函数本身不访问磁盘
+        """
+        now = time.time()
+        if now - self.last_check_time < self.reload_interval:
+            return False
+        self.last_check_time = now
+
+        changed = []
+        entries = dict(self.entries)
+        for names in self.groups.values():
+            for name in names:
+                path = os.path.join(self.templates_dir, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    # 文件被删除，保留旧模板继续使用
+                    continue
+
+                entry = entries.get(name)
+                if entry is None or mtime != entry.mtime:
+                    new_entry = self._load(path)
+                    if new_entry is not None:
+                        entries[name] = new_entry
+                        changed.append(name)
+
+        if changed:
+            # 整体替换字典，避免检测过程中看到半更新的状态
+            self.entries = entries
+            log.info("🔄 模板已重新加载: %s", ", ".join(changed))
+        return bool(changed)
@@ -0,0 +1,87 @@
+"""角色档案和动作时长测量测试"""
+
+import numpy as np
+import pytest
+
+# calibration 模块需要 pyautogui（校准时直接按键）
+pytest.importorskip("pyautogui")
+
+from calibration import TimingProfile, ActionTimer
+from change_detector import DirtyMap
+from movement_controller import MovementController
+
+DEFAULTS = {"speed_x": 300.0, "speed_y": 200.0, "attack": 0.5, "pickup": 0.3}
+
+
+def test_adapted_speed_does_not_drift_across_sessions(tmp_path):
+    path = str(tmp_path / "profile.json")
+    for _ in range(5):
+        profile = TimingProfile(path, DEFAULTS)
+        profile.load()
+        # 每次运行都撞墙：速度估计被压到允许范围的下限
+        movement = MovementController(speed_x=profile["speed_x"], speed_y=profile["speed_y"],
+                                      reference_x=profile.baseline["speed_x"],
+                                      reference_y=profile.baseline["speed_y"])
+        movement.speed_x = movement.speed_limits[0][0]
+        profile.set_adapted("speed_x", movement.speed_x)
+        profile.save()
+
+    profile = TimingProfile(path, DEFAULTS)
+    profile.load()
+    assert profile.baseline["speed_x"] == 300.0
+    assert profile["speed_x"] == 300.0 * 0.3
+
+
+def test_calibrated_values_become_baseline(tmp_path):
+    path = str(tmp_path / "profile.json")
+    profile = TimingProfile(path, DEFAULTS)
+    profile.set("attack", 0.8)
+    profile.adapt("attack", 0.0)
+    profile.save()
+
+    loaded = TimingProfile(path, DEFAULTS)
+    loaded.load()
+    assert loaded.baseline["attack"] == 0.8
+    assert loaded["attack"] < 0.8
+
+
+def dirty_map(changed_tiles):
+    tiles = np.zeros((10, 10), dtype=bool)
+    for row, col in changed_tiles:
+        tiles[row, col] = True
+    return DirtyMap(tiles, 64, 640, 640)
+
+
+def test_action_timer_reports_settle_time():
+    timer = ActionTimer(radius=100, quiet_tiles=0, settle_frames=2, timeout=3.0)
+    timer.begin("attack", (320, 320), 10.0)
+    assert timer.observe(dirty_map([(5, 5)]), 10.1) is None
+    assert timer.observe(dirty_map([(5, 5)]), 10.2) is None
+    # 远离角色的变化不影响判断
+    assert timer.observe(dirty_map([(0, 0)]), 10.3) is None
+    name, duration = timer.observe(dirty_map([]), 10.4)
+    assert name == "attack" and duration == pytest.approx(0.3)
+
+
+def test_action_timer_abandons_interrupted_measurement():
+    timer = ActionTimer(settle_frames=1)
+    timer.begin("pickup", (320, 320), 10.0)
+    timer.cancel()
+    assert timer.observe(dirty_map([]), 10.2) is None
+    assert timer.abandoned == 1
+
+
+def test_action_timer_waits_for_the_game_to_react():
+    timer = ActionTimer(radius=100, quiet_tiles=0, settle_frames=2, timeout=3.0)
+    timer.begin("attack", (320, 320), 10.0)
+    # 后台截图线程的最新帧早于按键
+    assert timer.observe(dirty_map([]), 9.98) is None
+    assert timer.observe(dirty_map([]), 10.0) is None
+    # 游戏还没有响应：安静的帧不能结束测量
+    assert timer.observe(dirty_map([]), 10.02) is None
+    assert timer.observe(dirty_map([]), 10.04) is None
+    assert timer.observe(dirty_map([(5, 5)]), 10.1) is None
+    assert timer.observe(dirty_map([(5, 5)]), 10.3) is None
+    assert timer.observe(dirty_map([]), 10.4) is None
+    name, duration = timer.observe(dirty_map([]), 10.5)
+    assert name == "attack" and duration == pytest.approx(0.4)
@@ -0,0 +1,122 @@
+"""共用绿色总范围掩码的角色定位器必须与原来各自独立的四种检测方法给出相同的结果"""
+
+import glob
+import os
+import cv2
+import numpy as np
+import pytest
+from frame import Frame
+from character_locator import CharacterLocator
+
+SHOTS = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      "debug_screenshots", "*.jpg")))
+
+
+def contours_of(image, lower, upper, morph=()):
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+    for op, size in morph:
+        mask = cv2.morphologyEx(mask, op, np.ones((size, size), np.uint8))
+    return cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+
+
+def centroid(contour):
+    m = cv2.moments(contour)
+    if m["m00"] == 0:
+        return None
+    return int(m["m10"] / m["m00"]), int(m["m01"] / m["m00"])
+
+
+# 以下为原来 DNFBot.detect_character_by_* 的实现（去掉了日志）
+
+def reference_text(image):
+    height, width = image.shape[:2]
+    best, best_score = None, 0
+    for c in contours_of(image, [35, 40, 40], [85, 255, 255],
+                         ((cv2.MORPH_CLOSE, 3), (cv2.MORPH_OPEN, 3))):
+        area = cv2.contourArea(c)
+        if 50 < area < 1500:
+            x, y, w, h = cv2.boundingRect(c)
+            aspect_ratio = w / h if h > 0 else 0
+            if 1.5 < aspect_ratio < 8 and w > 20:
+                char_x, char_y = x + w // 2, y + h + 40
+                if 100 < char_x < width - 100 and 100 < char_y < height - 100:
+                    distance = ((char_x - width // 2)**2 + (char_y - height // 2)**2)**0.5
+                    score = area * 0.1 - distance * 0.01
+                    if score > best_score:
+                        best_score, best = score, (char_x, char_y)
+    return best
+
+
+def reference_aura(image):
+    height, width = image.shape[:2]
+    for c in contours_of(image, [40, 100, 100], [80, 255, 255]):
+        area = cv2.contourArea(c)
+        if 200 < area < 3000:
+            perimeter = cv2.arcLength(c, True)
+            if perimeter > 0 and 4 * np.pi * area / (perimeter * perimeter) > 0.3:
+                center = centroid(c)
+                if center and 150 < center[0] < width - 150 and 150 < center[1] < height - 150:
+                    return center
+    return None
+
+
+def reference_path(image):
+    points = []
+    for c in contours_of(image, [35, 80, 80], [85, 255, 255]):
+        if 20 < cv2.contourArea(c) < 500:
+            x, y, w, h = cv2.boundingRect(c)
+            if 0.5 < w / h < 2.0 and max(w, h) < 30:
+                points.append((x + w // 2, y + h // 2))
+    if len(points) >= 2:
+        return (sum(p[0] for p in points) // len(points), sum(p[1] for p in points) // len(points))
+    return None
+
+
+def reference_glow(image):
+    height, width = image.shape[:2]
+    for c in contours_of(image, [45, 120, 150], [75, 255, 255], ((cv2.MORPH_CLOSE, 5),)):
+        if 100 < cv2.contourArea(c) < 2000:
+            center = centroid(c)
+            if center and 100 < center[0] < width - 100 and 100 < center[1] < height - 100:
+                return center
+    return None
+
+
+REFERENCES = {"text": reference_text, "aura": reference_aura, "path": reference_path, "glow": reference_glow}
+
+
+@pytest.mark.skipif(not SHOTS, reason="debug_screenshots 中没有截图")
+@pytest.mark.parametrize("size", [None, (2134, 1200)])
+@pytest.mark.parametrize("name", sorted(REFERENCES))
+def test_hypotheses_match_reference_detectors(name, size):
+    locator = CharacterLocator()
+    for path in SHOTS:
+        image = cv2.imread(path)
+        if size is not None:
+            image = cv2.resize(image, size)
+        full = (0, 0, image.shape[1], image.shape[0])
+        expected = REFERENCES[name](image)
+        assert locator.hypothesis(Frame(image), name) == expected, path
+        assert locator.hypothesis(Frame(image), name, full) == expected, path
+
+
+@pytest.mark.skipif(not SHOTS, reason="debug_screenshots 中没有截图")
+@pytest.mark.parametrize("name", sorted(REFERENCES))
+def test_windowed_hypotheses_match_cropped_reference(name):
+    locator = CharacterLocator()
+    image = cv2.imread(SHOTS[0])
+    height, width = image.shape[:2]
+    for x0, y0 in ((0, 0), (width // 3, height // 3), (width - 400, height - 300)):
+        roi = (x0, y0, x0 + 400, y0 + 300)
+        # 原来的检测方法在窗口内的结果（坐标平移回整帧，位置合理性按整帧判断）
+        padded = np.zeros_like(image)
+        padded[y0:y0 + 300, x0:x0 + 400] = image[y0:y0 + 300, x0:x0 + 400]
+        assert locator.hypothesis(Frame(image), name, roi) == REFERENCES[name](padded), roi
+
+
+def test_frame_without_green_skips_every_feature():
+    frame = Frame(np.full((600, 800, 3), 30, dtype=np.uint8))
+    locator = CharacterLocator()
+    assert locator.locate(frame) == (None, None)
+    assert all(key[0] != "green_contours" for key in frame._memo)
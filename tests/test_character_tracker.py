@@ -0,0 +1,29 @@
+"""角色跟踪器测试"""
+
+import pytest
+from character_tracker import CharacterTracker
+
+
+def locked_tracker():
+    tracker = CharacterTracker(alpha=0.5, beta=0.5, min_confidence=0.4)
+    tracker.update((100, 300), 10.0)
+    tracker.update((100, 300), 10.1)
+    return tracker
+
+
+def test_command_prior_survives_first_measurement():
+    tracker = locked_tracker()
+    # 依据 10.1 的截图发出向右移动的指令
+    tracker.notify_velocity(300, 0, 1.0, 10.1)
+    assert tracker.predict(10.2) == pytest.approx((130, 300))
+
+    tracker.update((128, 300), 10.2)
+    assert tracker.velocity[0] > 250
+
+
+def test_stale_measurement_does_not_rewind_time():
+    tracker = locked_tracker()
+    tracker.notify_velocity(300, 0, 1.0, 10.3)
+    assert not tracker.update((100, 300), 10.2)
+    assert tracker.last_time == 10.3
+    assert tracker.velocity == (300.0, 0.0)
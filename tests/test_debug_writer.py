@@ -0,0 +1,23 @@
+"""调试截图写入器轮换测试"""
+
+import os
+import numpy as np
+from debug_writer import DebugScreenshotWriter
+
+
+def test_rotation_keeps_files_it_did_not_write(tmp_path):
+    # 仓库自带的样例截图（最旧的文件）
+    fixtures = [tmp_path / f"debug_20250808_19134{i}.jpg" for i in range(3)]
+    for path in fixtures:
+        path.write_bytes(b"fixture")
+        os.utime(path, (0, 0))
+
+    writer = DebugScreenshotWriter(str(tmp_path), max_files=2)
+    writer.start()
+    image = np.zeros((32, 32, 3), dtype=np.uint8)
+    for i in range(4):
+        writer.submit(image, name=f"shot_{i}")
+    writer.stop()
+
+    assert all(path.exists() for path in fixtures)
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("shot_")) == ["shot_2.jpg", "shot_3.jpg"]
@@ -0,0 +1,66 @@
+"""检测器调度和刷图状态机的联合测试"""
+
+import config
+import dungeon_state
+from detector_scheduler import DetectorScheduler
+from dungeon_state import DungeonStateMachine
+
+# 各检测器的模拟耗时（毫秒），传送门检测最贵，预算内排不下全部检测器
+COSTS = {"character": 8, "monsters": 10, "items": 15, "materials": 40, "doors": 45}
+
+
+def simulate(scene, frames=40, fps=30.0, budget_ms=60.0):
+    """按帧驱动调度器和状态机，返回每帧的 (状态, 本帧运行的检测器)"""
+    scheduler = DetectorScheduler(config.DUNGEON_STATES, budget_ms=budget_ms,
+                                  deciding=dungeon_state.DECIDING_DETECTORS)
+    machine = DungeonStateMachine(end_timeout=60.0)
+    now = 1000.0
+    machine.entered_at = now
+    trace = []
+    for _ in range(frames):
+        due = scheduler.select(machine.state, machine.entered_at, now=now)
+        results = {name: scene.get(name, []) for name in due}
+        scheduler.record({name: COSTS[name] for name in due}, now=now)
+        # 状态在检测结束之后才决定，进入新状态的时间晚于本帧检测器的运行时间
+        state = machine.decide(machine.record(results), now=now + 0.005)
+        trace.append((state, due))
+        now += 1.0 / fps
+    return trace
+
+
+def test_navigate_is_stable_when_doors_exceed_budget():
+    trace = simulate({"character": (500, 500), "doors": [(900, 400)]})
+    states = [state for state, _ in trace]
+    first = states.index(dungeon_state.NAVIGATE)
+    assert set(states[first:]) == {dungeon_state.NAVIGATE}
+
+
+def test_deciding_detector_runs_on_first_frame_of_state():
+    trace = simulate({"character": (500, 500), "doors": [(900, 400)]})
+    states = [state for state, _ in trace]
+    first = states.index(dungeon_state.NAVIGATE)
+    # 进入寻路后的第一帧，传送门检测即使超出预算也要运行
+    assert "doors" in trace[first + 1][1]
+
+
+def test_loot_is_stable_with_cached_materials():
+    trace = simulate({"character": (500, 500), "items": [(300, 300)]})
+    states = [state for state, _ in trace]
+    first = states.index(dungeon_state.LOOT)
+    assert set(states[first:]) == {dungeon_state.LOOT}
+
+
+def test_equal_priority_follows_declaration_order():
+    rates = {"s": {"a": 1, "b": 1, "c": 1}}
+    scheduler = DetectorScheduler(rates, budget_ms=10.0)
+    scheduler.cost_ms = {"a": 8.0, "b": 8.0, "c": 8.0}
+    assert scheduler.select("s", 0.0, now=1.0) == ["a"]
+    scheduler.record({"a": 8.0}, now=1.0)
+    assert scheduler.select("s", 0.0, now=1.1) == ["b"]
+
+
+def test_deciding_detector_ignores_budget():
+    rates = {"s": {"a": None, "b": 2}}
+    scheduler = DetectorScheduler(rates, budget_ms=10.0, deciding={"s": "b"})
+    scheduler.cost_ms = {"a": 20.0, "b": 50.0}
+    assert scheduler.select("s", 0.0, now=1.0) == ["a", "b"]
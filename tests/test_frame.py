@@ -0,0 +1,48 @@
+"""帧缓存的并发测试"""
+
+import threading
+import time
+import numpy as np
+from frame import Frame
+
+
+def test_memo_does_not_block_other_entries():
+    frame = Frame(np.zeros((240, 320, 3), dtype=np.uint8))
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2.0)
+        return 1
+
+    worker = threading.Thread(target=lambda: frame.memo("slow", slow))
+    worker.start()
+    started.wait(2.0)
+    try:
+        start = time.perf_counter()
+        frame.pyramid(1)
+        frame.hsv
+        frame.memo("other", lambda: 2)
+        assert time.perf_counter() - start < 0.5
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_memo_computes_once_across_threads():
+    frame = Frame(np.zeros((8, 8, 3), dtype=np.uint8))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    threads = [threading.Thread(target=lambda: frame.memo("key", compute)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert frame.memo("key", compute) == 1
@@ -0,0 +1,37 @@
+"""输入调度器的按键时序测试（直接执行到期事件，不启动线程）"""
+
+import time
+from input_scheduler import InputScheduler
+
+
+def make_scheduler():
+    log = []
+    scheduler = InputScheduler(lambda k: log.append(("down", k)), lambda k: log.append(("up", k)))
+    return scheduler, log
+
+
+def test_changing_direction_keeps_shared_key_held():
+    scheduler, log = make_scheduler()
+    scheduler.hold(["up"], 1.0)
+    scheduler._flush_due(time.time())
+    scheduler.hold(["up", "left"], 1.0)
+    scheduler._flush_due(time.time())
+    # 上方向键不能松开再按下（连按两次是冲刺）
+    assert log == [("down", "up"), ("down", "left")]
+
+    scheduler.hold(["left"], 1.0)
+    scheduler._flush_due(time.time())
+    assert log[2:] == [("up", "up")]
+
+    scheduler.stop()
+    assert log[3:] == [("up", "left")]
+
+
+def test_same_keys_extend_hold():
+    scheduler, log = make_scheduler()
+    scheduler.hold(["right"], 0.0)
+    scheduler.hold(["right"], 1.0)
+    scheduler._flush_due(time.time())
+    assert log == [("down", "right")]
+    scheduler.stop()
+    assert log == [("down", "right"), ("up", "right")]
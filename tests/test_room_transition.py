@@ -0,0 +1,35 @@
+"""过图检测测试"""
+
+import numpy as np
+from frame import Frame
+from room_transition import RoomTransitionDetector
+
+
+def frame(value, t, noise=0):
+    image = np.full((240, 320, 3), value, dtype=np.uint8)
+    if noise:
+        # 每帧不同的画面：相邻帧直方图差异大，永远不稳定
+        image[:, : noise * 20] = 255
+    return Frame(image, timestamp=t)
+
+
+def test_settled_transition_reports_duration():
+    transition = RoomTransitionDetector(max_duration=2.0)
+    transition.begin(frame(120, 0.0), 0.0)
+    assert transition.observe(frame(10, 0.3)) == RoomTransitionDetector.TRANSITIONING
+    transition.observe(frame(200, 0.6))
+    assert transition.observe(frame(200, 0.7)) == RoomTransitionDetector.TRANSITIONING
+    assert transition.observe(frame(200, 0.8)) == RoomTransitionDetector.DONE
+    assert transition.last_duration == 0.8
+
+
+def test_timeout_is_reported_separately_and_waits_for_the_dark_screen():
+    transition = RoomTransitionDetector(max_duration=1.0)
+    transition.begin(frame(120, 0.0), 0.0)
+    assert transition.observe(frame(10, 0.3)) == RoomTransitionDetector.TRANSITIONING
+    # 超过最长时间时仍是黑屏：继续等待
+    assert transition.observe(frame(10, 1.2)) == RoomTransitionDetector.TRANSITIONING
+    # 画面亮了但一直没有稳定
+    assert transition.observe(frame(200, 1.3, noise=1)) == RoomTransitionDetector.TIMED_OUT
+    assert transition.timed_out == 1 and transition.completed == 0
+    assert transition.last_duration is None
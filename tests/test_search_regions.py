@@ -0,0 +1,13 @@
+"""模板搜索区域测试"""
+
+from search_regions import SearchRegionTracker
+
+
+def test_reset_drops_previous_room_hits():
+    regions = SearchRegionTracker({"doors": [(0.0, 0.0, 1.0, 1.0)]}, margin=10, full_search_interval=30)
+    regions.regions("doors", "door.png", 1000, 600, 40, 40)
+    regions.update("door.png", [(100, 100, 0.9, "door.png")])
+    assert regions.regions("doors", "door.png", 1000, 600, 40, 40) == [(70, 70, 130, 130)]
+
+    regions.reset()
+    assert regions.regions("doors", "door.png", 1000, 600, 40, 40) == [(0, 0, 1000, 600)]